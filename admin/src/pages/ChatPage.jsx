@@ -9,22 +9,47 @@ import toast from 'react-hot-toast'
 
 const API_URL = '/api'
 
-function DataTable({ data }) {
-  if (!data || !data.rows || data.rows.length === 0) return null
-  
+function DataTable({ data, query }) {
   const [expanded, setExpanded] = useState(false)
-  const displayRows = expanded ? data.rows : data.rows.slice(0, 10)
-  const cols = data.columns || Object.keys(data.rows[0] || {})
+  const [rows, setRows] = useState(data?.rows || [])
+  const [next, setNext] = useState(data?.next || null)
+  const [loadingMore, setLoadingMore] = useState(false)
+
+  if (!data || rows.length === 0) return null
+
+  const displayRows = expanded ? rows : rows.slice(0, 10)
+  const cols = data.columns || Object.keys(rows[0] || {})
+  // compact results carry each row as an array in column order
+  const values = row => Array.isArray(row) ? row : cols.map(col => row[col])
+
+  const loadMore = async () => {
+    if (!next || !query || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const page = await fetch(`${API_URL}/query`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ...query, cursor: next, page_size: 50, format: 'compact' })
+      }).then(r => r.json())
+      if (page.error) throw new Error(page.error)
+      setRows(prev => [...prev, ...page.rows])
+      setNext(page.next)
+      setExpanded(true)
+    } catch (err) {
+      toast.error(err.message || 'Failed to load more results')
+    }
+    setLoadingMore(false)
+  }
 
   return (
     <div className="mt-2 border border-dc-border rounded-xl overflow-hidden">
       <div className="flex items-center justify-between px-3 py-2 bg-dc-surface border-b border-dc-border">
         <div className="flex items-center gap-2">
           <Table2 className="w-3 h-3 text-dc-dim" />
-          <span className="text-[10px] text-dc-dim">{data.count || data.rows.length} result{(data.count || data.rows.length) > 1 ? 's' : ''}</span>
+          <span className="text-[10px] text-dc-dim">{rows.length}{next ? '+' : ''} result{rows.length > 1 ? 's' : ''}</span>
         </div>
         <button onClick={() => {
-          const text = data.rows.map(r => Object.values(r).join('\t')).join('\n')
+          const text = rows.map(r => values(r).join('\t')).join('\n')
           navigator.clipboard.writeText(text)
           toast.success('Copied')
         }} className="flex items-center gap-1 text-[10px] text-dc-dim hover:text-dc-muted">
@@ -45,9 +70,9 @@ function DataTable({ data }) {
           <tbody className="divide-y divide-dc-border">
             {displayRows.map((row, i) => (
               <tr key={i} className="hover:bg-dc-surface/50">
-                {cols.map(col => (
-                  <td key={col} className="px-3 py-1.5 text-dc-text whitespace-nowrap max-w-[200px] truncate">
-                    {row[col] || ''}
+                {values(row).map((val, j) => (
+                  <td key={j} className="px-3 py-1.5 text-dc-text whitespace-nowrap max-w-[200px] truncate">
+                    {val || ''}
                   </td>
                 ))}
               </tr>
@@ -55,17 +80,23 @@ function DataTable({ data }) {
           </tbody>
         </table>
       </div>
-      {data.rows.length > 10 && (
+      {rows.length > 10 && (
         <button onClick={() => setExpanded(!expanded)}
           className="w-full flex items-center justify-center gap-1 py-1.5 text-[10px] text-dc-dim hover:text-dc-muted border-t border-dc-border">
-          {expanded ? <><ChevronUp className="w-3 h-3" /> Show less</> : <><ChevronDown className="w-3 h-3" /> Show all {data.rows.length}</>}
+          {expanded ? <><ChevronUp className="w-3 h-3" /> Show less</> : <><ChevronDown className="w-3 h-3" /> Show all {rows.length}</>}
+        </button>
+      )}
+      {next && query && (
+        <button onClick={loadMore} disabled={loadingMore}
+          className="w-full flex items-center justify-center gap-1 py-1.5 text-[10px] text-dc-dim hover:text-dc-muted border-t border-dc-border disabled:opacity-50">
+          {loadingMore ? <Loader2 className="w-3 h-3 animate-spin" /> : <ArrowDown className="w-3 h-3" />} Load more
         </button>
       )}
     </div>
   )
 }
 
-function SQLBlock({ sql }) {
+function SQLBlock({ sql, params }) {
   if (!sql) return null
   return (
     <div className="mt-2">
@@ -76,6 +107,11 @@ function SQLBlock({ sql }) {
       <pre className="bg-dc-bg border border-dc-border rounded-lg px-3 py-2 text-xs font-mono text-dc-green overflow-x-auto">
         {sql}
       </pre>
+      {params && params.length > 0 && (
+        <pre className="mt-1 bg-dc-bg border border-dc-border rounded-lg px-3 py-1.5 text-[10px] font-mono text-dc-muted overflow-x-auto">
+          {params.map((p, i) => `?${i + 1} = ${JSON.stringify(p)}`).join('\n')}
+        </pre>
+      )}
     </div>
   )
 }
@@ -298,9 +334,15 @@ function MessageBubble({ message }) {
             </div>
           )}
         </div>
-        {message.sql && <SQLBlock sql={message.sql} />}
+        {message.job && (
+          <div className="flex items-center gap-1.5 mt-1 px-1">
+            <Loader2 className="w-3 h-3 text-purple-400 animate-spin" />
+            <span className="text-[10px] text-dc-dim">{message.stage || 'queued'}{message.ttft != null && ` \u2022 first token ${message.ttft}s`}</span>
+          </div>
+        )}
+        {message.sql && <SQLBlock sql={message.sql} params={message.params} />}
         {message.osint && <OsintPanel osint={message.osint} />}
-        {message.results && <DataTable data={message.results} />}
+        {message.results && <DataTable data={message.results} query={message.database && { database: message.database, sql: message.sql, params: message.params }} />}
         {message.time && (
           <div className="flex items-center gap-1 mt-1 px-1">
             <Clock className="w-2.5 h-2.5 text-dc-dim" />
@@ -402,6 +444,33 @@ export default function ChatPage({ activeConversation, setActiveConversation, co
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' })
   }, [messages])
 
+  const updateJobMessage = (jobId, patch) => {
+    setMessages(prev => prev.map(m => m.job === jobId ? { ...m, ...patch } : m))
+  }
+
+  const followJob = (jobId) => {
+    const events = new EventSource(`${API_URL}/jobs/${jobId}/events`)
+    events.addEventListener('progress', e => {
+      const { stage, ttft } = JSON.parse(e.data)
+      updateJobMessage(jobId, ttft != null ? { stage, ttft, content: '' } : { stage })
+    })
+    events.addEventListener('token', e => {
+      const { text } = JSON.parse(e.data)
+      setMessages(prev => prev.map(m => m.job === jobId ? { ...m, content: m.content + text } : m))
+    })
+    events.addEventListener('done', e => {
+      const { result } = JSON.parse(e.data)
+      updateJobMessage(jobId, { content: result.response, osint: result.osint, time: result.time, job: null, stage: null })
+      events.close()
+    })
+    events.addEventListener('error', e => {
+      const error = e.data ? JSON.parse(e.data).error : null
+      if (!error && events.readyState !== EventSource.CLOSED) return
+      updateJobMessage(jobId, { content: error ? `Erreur: ${error}` : t.error, job: null, stage: null })
+      events.close()
+    })
+  }
+
   const sendMessage = async () => {
     if (!input.trim() || loading) return
     
@@ -417,7 +486,8 @@ export default function ChatPage({ activeConversation, setActiveConversation, co
         body: JSON.stringify({ 
           message: userMsg, 
           conversation_id: activeConversation,
-          ai_mode: aiMode
+          ai_mode: aiMode,
+          format: 'compact'
         })
       })
       const data = await res.json()
@@ -433,13 +503,16 @@ export default function ChatPage({ activeConversation, setActiveConversation, co
 
       setMessages(prev => [...prev, {
         role: 'assistant',
-        content: data.response,
+        content: data.job ? t.osintSearching : data.response,
         sql: data.sql,
+        params: data.params,
         results: data.results,
         time: data.time,
         database: data.database,
-        osint: data.osint
+        osint: data.osint,
+        job: data.job?.id
       }])
+      if (data.job) followJob(data.job.id)
     } catch (err) {
       setMessages(prev => [...prev, {
         role: 'assistant',
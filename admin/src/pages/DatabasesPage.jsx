@@ -29,10 +29,10 @@ export default function DatabasesPage() {
 
   useEffect(() => { loadData() }, [])
 
-  const scanFiles = async () => {
+  const scanFiles = async (refresh = false) => {
     setScanning(true)
     try {
-      const res = await fetch(`${API_URL}/databases/scan`)
+      const res = await fetch(`${API_URL}/databases/scan${refresh ? '?refresh=1' : ''}`)
       const data = await res.json()
       setAvailableFiles(data)
     } catch {
@@ -43,24 +43,42 @@ export default function DatabasesPage() {
 
   useEffect(() => { scanFiles() }, [])
 
-  const importFile = async (file) => {
+  const formatBytes = (b) => b > 1024 ** 3 ? `${(b / 1024 ** 3).toFixed(1)} GB` : `${(b / 1024 ** 2).toFixed(1)} MB`
+  const formatMb = (mb) => mb > 1024 ? `${(mb / 1024).toFixed(1)} GB` : `${mb} MB`
+
+  const describeJob = (job) => {
+    if (job.stage && job.stage !== 'loading') return `${job.name}: ${job.rows.toLocaleString()} rows loaded, ${job.stage}...`
+    const eta = job.eta != null ? ` • ETA ${Math.ceil(job.eta)}s` : ''
+    return `${job.name}: ${job.rows.toLocaleString()} rows • ${job.rows_per_s.toLocaleString()} rows/s • ${formatBytes(job.bytes_read)} / ${formatBytes(job.total_bytes)}${job.compression ? ` ${job.compression.slice(1)}` : ''}${eta}`
+  }
+
+  const isSqlite = (file) => !file.compression && ['.db', '.sqlite', '.sqlite3'].includes(file.type)
+
+  const importFile = async (file, mode) => {
     setImporting(file.name)
-    const toastId = toast.loading(`Importing ${file.filename}... This may take a while for large files.`)
+    const toastId = toast.loading(mode === 'attach' ? `Attaching ${file.filename}...` : `Importing ${file.filename}... This may take a while for large files.`)
     
     try {
       const res = await fetch(`${API_URL}/databases/import`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ path: file.path, name: file.name })
+        body: JSON.stringify({ path: file.path, name: file.name, mode })
       })
-      const data = await res.json()
+      let data = await res.json()
+      if (!res.ok) throw new Error(data.detail || 'Unknown error')
+
+      while (data.status === 'queued' || data.status === 'running') {
+        await new Promise(r => setTimeout(r, 1000))
+        data = await fetch(`${API_URL}/databases/import/${data.id}`).then(r => r.json())
+        if (data.status === 'running') toast.loading(describeJob(data), { id: toastId })
+      }
       
       if (data.success) {
         toast.success(`Imported ${file.name}: ${data.row_count.toLocaleString()} rows`, { id: toastId })
         loadData()
         scanFiles()
       } else {
-        toast.error(`Import failed: ${data.detail || 'Unknown error'}`, { id: toastId })
+        toast.error(`Import failed: ${data.error || data.detail || 'Unknown error'}`, { id: toastId })
       }
     } catch (err) {
       toast.error(`Import failed: ${err.message}`, { id: toastId })
@@ -70,18 +88,19 @@ export default function DatabasesPage() {
 
   const getFileIcon = (type) => {
     switch(type) {
-      case '.json': return '{ }'
+      case '.json': case '.jsonl': case '.ndjson': return '{ }'
       case '.csv': return 'CSV'
-      case '.db': case '.sqlite': return 'DB'
+      case '.txt': return 'TXT'
+      case '.db': case '.sqlite': case '.sqlite3': return 'DB'
       default: return '?'
     }
   }
 
   const getFileColor = (type) => {
     switch(type) {
-      case '.json': return 'text-yellow-400 bg-yellow-400/10'
+      case '.json': case '.jsonl': case '.ndjson': return 'text-yellow-400 bg-yellow-400/10'
       case '.csv': return 'text-green-400 bg-green-400/10'
-      case '.db': case '.sqlite': return 'text-blue-400 bg-blue-400/10'
+      case '.db': case '.sqlite': case '.sqlite3': return 'text-blue-400 bg-blue-400/10'
       default: return 'text-dc-muted bg-dc-card'
     }
   }
@@ -96,7 +115,7 @@ export default function DatabasesPage() {
             <p className="text-sm text-dc-muted mt-1">Manage and import your data sources</p>
           </div>
           <button
-            onClick={scanFiles}
+            onClick={() => scanFiles(true)}
             disabled={scanning}
             className="flex items-center gap-2 px-4 py-2 bg-dc-card border border-dc-border rounded-lg hover:border-dc-accent/50 transition-colors text-sm"
           >
@@ -142,7 +161,10 @@ export default function DatabasesPage() {
                       </div>
                       <div>
                         <h3 className="font-medium text-dc-text">{db.name}</h3>
-                        <p className="text-xs text-dc-muted">{(db.row_count || 0).toLocaleString()} records</p>
+                        <p className="text-xs text-dc-muted">
+                          {(db.row_count || 0).toLocaleString()} records
+                          {db.attached ? ` • attached in place, ${Object.keys(db.tables || {}).length} table(s), chat uses ${db.table}` : ''}
+                        </p>
                       </div>
                     </div>
                     <span className="text-xs bg-dc-green/10 text-dc-green px-2.5 py-1 rounded-full">Ready</span>
@@ -174,7 +196,7 @@ export default function DatabasesPage() {
             <div className="bg-dc-card border border-dc-border rounded-xl p-8 text-center">
               <AlertCircle className="w-8 h-8 text-dc-dim mx-auto mb-3" />
               <p className="text-sm text-dc-muted">No importable files found</p>
-              <p className="text-xs text-dc-dim mt-1">Supported formats: .json, .csv, .db, .sqlite</p>
+              <p className="text-xs text-dc-dim mt-1">Supported formats: .csv, .json, .jsonl, .txt, .db, .sqlite (text formats also as .gz, .bz2, .xz, .zip, .7z)</p>
             </div>
           ) : (
             <div className="space-y-2">
@@ -187,34 +209,59 @@ export default function DatabasesPage() {
                     <div>
                       <h3 className="font-medium text-dc-text text-sm">{file.filename}</h3>
                       <p className="text-xs text-dc-muted">
-                        {file.size_mb > 1024 ? `${(file.size_mb / 1024).toFixed(1)} GB` : `${file.size_mb} MB`}
-                        {file.type === '.rar' || file.type === '.7z' ? ' (compressed)' : ''}
+                        {formatMb(file.size_mb)}
+                        {file.compression ? ` (${file.compression.slice(1)}${file.uncompressed_mb != null ? `, ${formatMb(file.uncompressed_mb)} uncompressed` : ''})` : ''}
                       </p>
                     </div>
                   </div>
                   
-                  {file.imported ? (
-                    <span className="flex items-center gap-1.5 text-xs text-dc-green">
-                      <Check className="w-3.5 h-3.5" /> Imported
-                    </span>
-                  ) : file.type === '.rar' || file.type === '.7z' ? (
-                    <span className="text-xs text-dc-dim">Extract first</span>
-                  ) : (
+                  {file.imported && file.stale ? (
                     <button
-                      onClick={() => importFile(file)}
+                      onClick={() => importFile(file, file.attached ? 'attach' : undefined)}
                       disabled={importing !== null}
-                      className={`flex items-center gap-2 px-4 py-2 rounded-lg text-sm transition-colors ${
-                        importing === file.name
-                          ? 'bg-dc-accent/20 text-dc-accent'
-                          : 'bg-dc-accent text-white hover:bg-dc-accent2'
-                      }`}
+                      title={`Source changed since import (${file.imported_at})`}
+                      className="flex items-center gap-2 px-4 py-2 rounded-lg text-sm bg-yellow-500/10 text-yellow-400 hover:bg-yellow-500/20 transition-colors"
                     >
                       {importing === file.name ? (
                         <><Loader2 className="w-4 h-4 animate-spin" /> Importing...</>
                       ) : (
-                        <><Upload className="w-4 h-4" /> Import</>
+                        <><RefreshCw className="w-4 h-4" /> Changed, re-import</>
                       )}
                     </button>
+                  ) : file.imported ? (
+                    <span className="flex items-center gap-1.5 text-xs text-dc-green">
+                      <Check className="w-3.5 h-3.5" /> Imported
+                    </span>
+                  ) : !file.importable ? (
+                    <span className="text-xs text-dc-dim">Extract first</span>
+                  ) : (
+                    <div className="flex items-center gap-2">
+                      {isSqlite(file) && (
+                        <button
+                          onClick={() => importFile(file, 'attach')}
+                          disabled={importing !== null}
+                          title="Query the file where it is, without copying it"
+                          className="flex items-center gap-2 px-4 py-2 rounded-lg text-sm bg-dc-surface border border-dc-border text-dc-muted hover:text-dc-text transition-colors"
+                        >
+                          <Database className="w-4 h-4" /> Attach
+                        </button>
+                      )}
+                      <button
+                        onClick={() => importFile(file)}
+                        disabled={importing !== null}
+                        className={`flex items-center gap-2 px-4 py-2 rounded-lg text-sm transition-colors ${
+                          importing === file.name
+                            ? 'bg-dc-accent/20 text-dc-accent'
+                            : 'bg-dc-accent text-white hover:bg-dc-accent2'
+                        }`}
+                      >
+                        {importing === file.name ? (
+                          <><Loader2 className="w-4 h-4 animate-spin" /> Importing...</>
+                        ) : (
+                          <><Upload className="w-4 h-4" /> Import</>
+                        )}
+                      </button>
+                    </div>
                   )}
                 </div>
               ))}
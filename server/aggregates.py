@@ -0,0 +1,83 @@
+from normalize import CP_KEYWORDS, CITY_KEYWORDS, matching_columns
+
+def agg_table(table, kind):
+    return f"{table}__agg_{kind}"
+
+def build_aggregates(conn, table, columns, shadow=None):
+    """Precompute the counts behind parse_query's COUNT intents.
+
+    Builds per-postcode, per-department (2-digit postcode prefix), per-city
+    (trimmed, uppercased) and total counts as small side tables. Postcodes
+    are read from their normalized shadow column when `shadow` has one.
+    Returns the metadata to record in the registry: which source column each
+    summary covers and the table that holds it.
+    """
+    shadow = shadow or {}
+    meta = {}
+    total = agg_table(table, "total")
+    conn.execute(f'DROP TABLE IF EXISTS "{total}"')
+    conn.execute(f'CREATE TABLE "{total}" AS SELECT COUNT(*) AS n FROM "{table}"')
+    meta["total"] = {"table": total}
+
+    cp_cols = matching_columns(columns, CP_KEYWORDS)
+    if cp_cols:
+        col = cp_cols[0]
+        src = shadow.get(col, col)
+        cp, dept = agg_table(table, "cp"), agg_table(table, "dept")
+        conn.execute(f'DROP TABLE IF EXISTS "{cp}"')
+        conn.execute(f'CREATE TABLE "{cp}" (key TEXT PRIMARY KEY, n INTEGER) WITHOUT ROWID')
+        conn.execute(f'INSERT INTO "{cp}" SELECT "{src}", COUNT(*) FROM "{table}" WHERE "{src}" IS NOT NULL GROUP BY "{src}"')
+        conn.execute(f'DROP TABLE IF EXISTS "{dept}"')
+        conn.execute(f'CREATE TABLE "{dept}" (key TEXT PRIMARY KEY, n INTEGER) WITHOUT ROWID')
+        conn.execute(f'INSERT INTO "{dept}" SELECT SUBSTR(key, 1, 2), SUM(n) FROM "{cp}" GROUP BY SUBSTR(key, 1, 2)')
+        meta["cp"] = {"column": col, "table": cp}
+        meta["dept"] = {"column": col, "table": dept}
+
+    city_cols = matching_columns(columns, CITY_KEYWORDS)
+    if city_cols:
+        col = city_cols[0]
+        city = agg_table(table, "city")
+        conn.execute(f'DROP TABLE IF EXISTS "{city}"')
+        conn.execute(f'CREATE TABLE "{city}" (key TEXT PRIMARY KEY, n INTEGER) WITHOUT ROWID')
+        conn.execute(f'INSERT INTO "{city}" SELECT UPPER(TRIM("{col}")), COUNT(*) FROM "{table}" WHERE "{col}" IS NOT NULL GROUP BY UPPER(TRIM("{col}"))')
+        meta["city"] = {"column": col, "table": city}
+
+    conn.commit()
+    return meta
+
+def adjust_aggregates(conn, table, aggregates, where, params=(), shadow=None, sign=1):
+    """Add (sign=1) or subtract (sign=-1) the rows of `table` matching `where` in its summaries.
+
+    Uses the same keys as build_aggregates, so a delta import keeps the
+    summaries exact without regrouping the whole table. Keys whose count
+    drops to zero are removed.
+    """
+    shadow = shadow or {}
+    for kind, agg in (aggregates or {}).items():
+        t = agg["table"]
+        if kind == "total":
+            conn.execute(f'UPDATE "{t}" SET n = n + ? * (SELECT COUNT(*) FROM "{table}" WHERE {where})', [sign, *params])
+            continue
+        col = agg["column"]
+        src = col if kind == "city" else shadow.get(col, col)
+        expr = {"cp": f'"{src}"', "dept": f'SUBSTR("{src}", 1, 2)', "city": f'UPPER(TRIM("{src}"))'}[kind]
+        conn.execute(f'''INSERT INTO "{t}" (key, n) SELECT {expr}, ? * COUNT(*) FROM "{table}"
+            WHERE ({where}) AND "{src}" IS NOT NULL GROUP BY {expr}
+            ON CONFLICT(key) DO UPDATE SET n = n + excluded.n''', [sign, *params])
+        conn.execute(f'DELETE FROM "{t}" WHERE n <= 0')
+
+def count_sql(aggregates, kind, column=None):
+    """SQL answering a COUNT intent from its summary table, or None if not covered.
+
+    `kind` is 'cp' (exact postcode), 'dept' (2-digit prefix), 'city'
+    (substring of the normalized city, bound as '%CITY%') or 'total'.
+    """
+    agg = (aggregates or {}).get(kind)
+    if not agg or (column is not None and agg.get("column") != column):
+        return None
+    t = agg["table"]
+    if kind == "total":
+        return f'SELECT n AS total FROM "{t}"'
+    if kind == "city":
+        return f'SELECT COALESCE(SUM(n), 0) AS total FROM "{t}" WHERE key LIKE ?'
+    return f'SELECT COALESCE((SELECT n FROM "{t}" WHERE key = ?), 0) AS total'
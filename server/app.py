@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 import sqlite3
 import json
@@ -8,175 +8,140 @@ import io
 import re
 import time
 import hashlib
+import atexit
+import itertools
 import httpx
 import threading
 import urllib.parse
-from datetime import datetime
+from collections.abc import Mapping
 from pathlib import Path
 from osint_engine import run_deep_osint, analyze_email, analyze_phone
+from db_pool import get_pool, reset_pool, pool_stats
+from nlp_engine import parse_query, query_intent, DbMatcher
+from schema_profile import compile_profiles
+from registry import init_index_db, read_stats, Registry
+from query_cache import QueryCache
+from importer import ImportQueue, IMPORTABLE
+from compressed import COMPRESSED, source_name
+from scanner import SourceScanner, is_stale
+from paging import keyset_sql, without_limit, encode_cursor, decode_cursor
+from jobs import JobQueue, QueueFull
+from summary_cache import SummaryCache
+from message_log import MessageLog
+from query_guard import QueryGuard, QueryTimeout
+from metrics import Metrics
+from slow_queries import SlowQueryLog
+from serialize import compact, dumps, encode
 
 OLLAMA_URL = "http://localhost:11434"
 OLLAMA_MODEL = "qwen2.5:7b"
+OLLAMA_KEEP_ALIVE = "30m"           # how long Ollama keeps the model loaded between requests
+
+POOL_SIZE = 4                       # read connections kept open per database
+POOL_MMAP_SIZE = 512 * 1024 * 1024  # bytes of each database mapped into memory
+POOL_CACHE_KB = 65536               # page cache per connection
+QUERY_CACHE_MB = 256                # memory budget for cached query results
+QUERY_CACHE_TTL = 600               # seconds a cached result stays valid
+IMPORT_WORKERS = 1                  # imports running at the same time
+IMPORT_PARSE_WORKERS = max(1, (os.cpu_count() or 1) - 1)  # parser processes per import
+PAGE_SIZE = 50                      # rows per results page (chat and /api/query)
+MAX_PAGE_SIZE = 5000                # largest page a client may ask for
+STREAM_BATCH = 1000                 # rows fetched per step when streaming NDJSON
+AI_WORKERS = 2                      # AI-mode reports (OSINT + Ollama) running at once
+AI_QUEUE_DEPTH = 8                  # AI-mode reports allowed to wait; more get a 429
+SUMMARY_CACHE_MB = 64               # disk budget for cached Ollama reports in the index DB
+REGISTRY_CHECK_INTERVAL = 2.0       # seconds between checks of the index DB for new imports
+SCAN_INTERVAL = 30                  # seconds between rescans of DATABASES_PATH (immediate with watchdog)
+SCAN_HASH_BYTES = 65536             # bytes hashed at each end of a source file; 0 = size and mtime only
+QUERY_BUDGETS = {                   # (seconds, SQLite VM steps) a query may use per endpoint; None = no limit
+    "chat": (5, 200_000_000),
+    "query": (30, 2_000_000_000),
+    "stream": (300, None),
+}
+SLOW_QUERY_MS = 200                 # run_query executions slower than this are logged with their plan; None = off
 
 app = Flask(__name__)
 CORS(app)
 
 DB_DIR = Path("data")
-DB_DIR.mkdir(exist_ok=True)
 INDEX_DB = DB_DIR / "datachat_index.db"
 DATABASES_PATH = Path(r"H:\databases")
 
-def init_db():
-    conn = sqlite3.connect(str(INDEX_DB))
-    conn.execute("""CREATE TABLE IF NOT EXISTS databases (
-        name TEXT PRIMARY KEY, source_path TEXT, db_path TEXT,
-        tables TEXT, row_count INTEGER, status TEXT, imported_at TEXT)""")
-    conn.execute("""CREATE TABLE IF NOT EXISTS conversations (
-        id TEXT PRIMARY KEY, title TEXT, created_at TEXT, updated_at TEXT)""")
-    conn.execute("""CREATE TABLE IF NOT EXISTS messages (
-        id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id TEXT,
-        role TEXT, content TEXT, sql_query TEXT, results_count INTEGER, created_at TEXT)""")
-    conn.commit()
-    conn.close()
-
-init_db()
-
-databases = {}
-
-def load_databases():
-    global databases
-    databases = {}
-    conn = sqlite3.connect(str(INDEX_DB))
-    rows = conn.execute("SELECT name, source_path, db_path, tables, row_count, status FROM databases").fetchall()
-    for name, source_path, db_path, tables, row_count, status in rows:
-        if db_path and os.path.exists(db_path):
-            databases[name] = {
-                "source_path": source_path, "db_path": db_path,
-                "columns": json.loads(tables) if tables else [],
-                "row_count": row_count, "status": status
-            }
-    conn.close()
-
-load_databases()
-
-def scan_files():
+metrics = Metrics()
+query_guard = QueryGuard(QUERY_BUDGETS)
+query_cache = QueryCache(max_bytes=QUERY_CACHE_MB * 1024 * 1024, ttl=QUERY_CACHE_TTL)
+ai_jobs = JobQueue(workers=AI_WORKERS, max_pending=AI_QUEUE_DEPTH, name="ai")
+
+# set by create_app
+slow_log = summary_cache = message_log = registry = source_scanner = import_queue = None
+
+def derive_registry(databases):
+    profiles = compile_profiles(INDEX_DB, databases)
+    return {"profiles": profiles, "matcher": DbMatcher(databases, profiles)}
+
+def on_registry_change(old, new):
+    for name, info in old.databases.items():
+        current = new.databases.get(name)
+        if not current or (current["db_path"], current["imported_at"]) != (info["db_path"], info["imported_at"]):
+            reset_pool(name)
+            query_cache.invalidate(name)
+
+def create_app(db_dir=DB_DIR, index_db=None, databases_path=DATABASES_PATH):
+    """Open the index DB and start the registry, scanner and import queue; returns the Flask app.
+
+    Importing this module has no side effects: spawned import parsers
+    re-import it as `__mp_main__`. `index_db` defaults to `<db_dir>/datachat_index.db`.
+    """
+    global DB_DIR, INDEX_DB, DATABASES_PATH, slow_log, summary_cache, message_log, registry, source_scanner, import_queue
+    DB_DIR = Path(db_dir)
+    DB_DIR.mkdir(parents=True, exist_ok=True)
+    INDEX_DB = Path(index_db) if index_db else DB_DIR / "datachat_index.db"
+    DATABASES_PATH = Path(databases_path)
+    init_index_db(INDEX_DB)
+
+    slow_log = SlowQueryLog(INDEX_DB, threshold_ms=SLOW_QUERY_MS)
+    summary_cache = SummaryCache(INDEX_DB, max_bytes=SUMMARY_CACHE_MB * 1024 * 1024)
+    message_log = MessageLog(INDEX_DB)
+    atexit.register(message_log.close)
+
+    registry = Registry(INDEX_DB, derive=derive_registry, on_change=on_registry_change, interval=REGISTRY_CHECK_INTERVAL)
+    registry.refresh()
+
+    source_scanner = SourceScanner(DATABASES_PATH, IMPORTABLE + COMPRESSED, interval=SCAN_INTERVAL, hash_bytes=SCAN_HASH_BYTES)
+
+    import_queue = ImportQueue(workers=IMPORT_WORKERS, on_done=lambda job: registry.refresh(force=True),
+                               db_dir=DB_DIR, index_db=INDEX_DB, parse_workers=IMPORT_PARSE_WORKERS,
+                               hash_bytes=SCAN_HASH_BYTES)
+    return app
+
+def scan_files(refresh=False):
+    """Importable files in DATABASES_PATH from the scanner's cache, with import status.
+
+    `stale` marks imported sources whose content changed since the import.
+    Compressed files report the format and, when recorded, the size of what
+    they contain; `importable` is false when that content can't be streamed.
+    """
+    databases = registry.databases
+    files = source_scanner.rescan() if refresh else source_scanner.wait_ready()
     found = []
-    if not DATABASES_PATH.exists():
-        return found
-    for f in DATABASES_PATH.iterdir():
-        ext = f.suffix.lower()
-        if ext in ['.json', '.csv', '.db', '.sqlite', '.sqlite3', '.txt', '.rar', '.7z']:
-            size_mb = f.stat().st_size / (1024 * 1024)
-            found.append({
-                "name": f.stem, "filename": f.name, "path": str(f),
-                "size_mb": round(size_mb, 1), "type": ext,
-                "imported": f.stem in databases,
-                "status": databases.get(f.stem, {}).get("status", "not_imported")
-            })
+    for f in files:
+        info = databases.get(f["name"])
+        found.append({
+            "name": f["name"], "filename": f["filename"], "path": f["path"],
+            "size_mb": round(f["size"] / (1024 * 1024), 1), "type": f["type"],
+            "compression": f["compression"],
+            "uncompressed_mb": round(f["uncompressed_size"] / (1024 * 1024), 1) if f["uncompressed_size"] is not None else None,
+            "importable": f["type"] in IMPORTABLE and not (f["compression"] and f["type"] in ('.db', '.sqlite', '.sqlite3')),
+            "imported": info is not None,
+            "status": info["status"] if info else "not_imported",
+            "imported_at": info["imported_at"] if info else None,
+            "attached": bool(info) and info["immutable"],
+            "stale": bool(info) and is_stale(f, info["meta"].get("source"), info["imported_at"])
+        })
     return found
 
-def parse_query(user_msg, db_name, columns):
-    q = user_msg.lower()
-    
-    if any(kw in q for kw in ['combien', 'nombre', 'count', 'total', 'nb ', 'how many', 'how much']):
-        dept = re.search(r'\b(\d{2})\b', user_msg)
-        cp = re.search(r'\b(\d{5})\b', user_msg)
-        
-        if cp:
-            cp_cols = [c for c in columns if any(k in c for k in ['code_postal', 'cp', 'postal', 'adresse_code_postal'])]
-            if cp_cols:
-                return f'SELECT COUNT(*) as total FROM "{db_name}" WHERE "{cp_cols[0]}" = \'{cp.group(1)}\''
-        
-        if dept:
-            cp_cols = [c for c in columns if any(k in c for k in ['code_postal', 'cp', 'postal', 'adresse_code_postal'])]
-            if cp_cols:
-                return f'SELECT COUNT(*) as total FROM "{db_name}" WHERE "{cp_cols[0]}" LIKE \'{dept.group(1)}%\''
-        
-        city_match = re.search(r'(?:à|a|de|dans|sur|in|from|at)\s+([A-ZÀ-Üa-zà-ü\s\-]+)', q)
-        if city_match:
-            city = city_match.group(1).strip().upper()
-            if city not in ['LE', 'LA', 'LES', 'UN', 'UNE', 'DES', 'THE', 'A']:
-                city_cols = [c for c in columns if any(k in c for k in ['ville', 'commune', 'city'])]
-                if city_cols:
-                    return f'SELECT COUNT(*) as total FROM "{db_name}" WHERE UPPER("{city_cols[0]}") LIKE \'%{city}%\''
-        
-        return f'SELECT COUNT(*) as total FROM "{db_name}"'
-    
-    email = re.search(r'[\w.\-]+@[\w.\-]+\.\w+', user_msg)
-    if email:
-        email_cols = [c for c in columns if any(k in c for k in ['email', 'mail', 'courriel'])]
-        if email_cols:
-            return f'SELECT * FROM "{db_name}" WHERE UPPER("{email_cols[0]}") = UPPER(\'{email.group()}\') LIMIT 50'
-    
-    phone = re.search(r'(\+33|0[67])\s*\d[\d\s]{7,}', user_msg)
-    if phone:
-        ph = re.sub(r'\s', '', phone.group())
-        phone_cols = [c for c in columns if any(k in c for k in ['tel', 'phone', 'telephone'])]
-        if phone_cols:
-            return f'SELECT * FROM "{db_name}" WHERE "{phone_cols[0]}" LIKE \'%{ph}%\' LIMIT 50'
-    
-    cp = re.search(r'\b(\d{5})\b', user_msg)
-    if cp and not any(kw in q for kw in ['combien', 'nombre']):
-        cp_cols = [c for c in columns if any(k in c for k in ['code_postal', 'cp', 'postal', 'adresse_code_postal'])]
-        if cp_cols:
-            return f'SELECT * FROM "{db_name}" WHERE "{cp_cols[0]}" = \'{cp.group(1)}\' LIMIT 50'
-    
-    caps_words = [w for w in user_msg.split() if w.isupper() and len(w) > 1 and not w.isdigit()]
-    
-    common_lower = {
-            'cherche','trouve','recherche','moi','les','des','dans','la','le','un','une',
-            'qui','que','est','sont','avec','pour','sur','de','du','au','aux','info',
-            'informations','donne','montre','affiche','tout','tous','toutes','base',
-            'données','database','personnes','personne','gens','liste','boulanger','caf',
-            'fait','faire','approfondie','aprofondie','profonde','rechercher','cherhce',
-            'details','detail','fiche','profil','osint','analyse','analyser','rapport',
-            'propos','infos','chercher','trouver','donner','montrer','afficher','lister',
-            'combien','nombre','total','count','email','telephone','adresse','ville',
-            'code','postal','nom','prenom','where','from','select',
-            'find','search','look','lookup','get','show','give','tell','about',
-            'the','and','for','with','this','that','what','who','how','many',
-            'people','person','user','users','information','data','deep',
-            'scan','report','profile','investigate','investigation','check',
-            'all','any','some','please','can','you','me','his','her','their',
-            'address','city','phone','name','first','last','number','results',
-            'much','more','list','display','fetch','query','run'}
-    
-    if caps_words:
-        words = caps_words
-    else:
-        words = [w for w in user_msg.split() if w.lower() not in common_lower and len(w) > 1 and not w.isdigit()]
-    
-    if words:
-        name_cols = [c for c in columns if any(k in c for k in ['nom', 'name', 'prenom', 'nom_complet'])]
-        if name_cols and len(words) >= 2:
-            word_conds = []
-            for w in words:
-                w_cond = " OR ".join([f'UPPER("{c}") LIKE UPPER(\'%{w}%\')' for c in name_cols])
-                word_conds.append(f"({w_cond})")
-            conds_and = " AND ".join(word_conds)
-            return f'SELECT * FROM "{db_name}" WHERE {conds_and} LIMIT 50'
-        elif name_cols:
-            search = words[0]
-            conds = " OR ".join([f'UPPER("{c}") LIKE UPPER(\'%{search}%\')' for c in name_cols])
-            return f'SELECT * FROM "{db_name}" WHERE {conds} LIMIT 50'
-        else:
-            search = words[0]
-            conds = " OR ".join([f'UPPER("{c}") LIKE UPPER(\'%{search}%\')' for c in columns[:5]])
-            return f'SELECT * FROM "{db_name}" WHERE {conds} LIMIT 50'
-    
-    return f'SELECT * FROM "{db_name}" LIMIT 20'
-
-def detect_db(query):
-    q = query.lower()
-    for name in databases:
-        if name.lower() in q:
-            return name
-    if any(kw in q for kw in ['caf', 'allocataire', 'aah', 'organisme']):
-        for name, info in databases.items():
-            if any('matricule' in c for c in info["columns"]):
-                return name
-    ready = [n for n in databases if databases[n]["status"] == "ready"]
-    return ready[0] if ready else None
+def detect_db(query, snap=None):
+    return (snap or registry.snapshot()).derived["matcher"].match(query)
 
 def format_response(query, results, db_name, elapsed):
     count = results["count"]
@@ -189,49 +154,194 @@ def format_response(query, results, db_name, elapsed):
         total = rows[0]['total']
         return f"**{total:,}** enregistrements trouvés dans **{db_name}** ({elapsed}s)"
     
-    response = f"**{count} résultat{'s' if count > 1 else ''}** dans **{db_name}** ({elapsed}s)\n\n"
+    more = "+" if results.get("next") else ""
+    parts = [f"**{count}{more} résultat{'s' if count > 1 else ''}** dans **{db_name}** ({elapsed}s)\n\n"]
     for i, row in enumerate(rows[:5]):
-        response += f"### Résultat {i+1}\n"
+        parts.append(f"### Résultat {i+1}\n")
         for key, val in row.items():
             if val and str(val).strip() and str(val) != 'None':
-                display_key = key.replace('_', ' ').title()
-                response += f"- **{display_key}**: {val}\n"
-        response += "\n"
+                parts.append(f"- **{key.replace('_', ' ').title()}**: {val}\n")
+        parts.append("\n")
     if count > 5:
-        response += f"\n*...et {count - 5} autres résultats dans le tableau.*"
-    return response
+        parts.append(f"\n*...et {count - 5} autres résultats dans le tableau.*")
+    return "".join(parts)
+
+def db_pool(db_name):
+    info = registry.databases[db_name]
+    return get_pool(db_name, info["db_path"], info.get("imported_at"),
+                    size=POOL_SIZE, mmap_size=POOL_MMAP_SIZE, cache_kb=POOL_CACHE_KB, immutable=info["immutable"])
 
-def run_query(db_name, sql, limit=100):
-    if db_name not in databases:
+def check_query(db_name, sql):
+    if db_name not in registry.databases:
         raise ValueError(f"Database '{db_name}' not found")
-    conn = sqlite3.connect(databases[db_name]["db_path"])
-    conn.row_factory = sqlite3.Row
     if not sql.strip().upper().startswith("SELECT"):
         raise ValueError("Only SELECT allowed")
-    if "LIMIT" not in sql.upper():
+
+def page_tables(info):
+    """Tables of a registered database that keyset paging can read (the ones with a rowid)."""
+    tables = info["meta"].get("tables")
+    return [t for t, d in tables.items() if d["rowid"]] if tables else [info["table"]]
+
+def run_query(db_name, sql, params=(), limit=100, use_cache=True, cursor=None, page_size=None, endpoint="query"):
+    """Run a SELECT on the database's pool and return its rows as dicts.
+
+    The query runs under the `endpoint` budget of QUERY_BUDGETS and raises
+    QueryTimeout when it runs out or is cancelled. Executions slower than
+    SLOW_QUERY_MS go to the slow-query log with their query plan.
+
+    With `page_size`, row queries on the database's tables are paged by rowid:
+    the result carries a `next` token to pass back as `cursor` for the
+    following page (None on the last one). A LIMIT in the query caps the rows
+    served across all pages. Queries with named parameters are not paged.
+    Other queries get a LIMIT appended when they have none.
+    """
+    check_query(db_name, sql)
+    info = registry.databases[db_name]
+    version = info.get("imported_at")
+    paged = None
+    if page_size and not isinstance(params, Mapping):
+        paged = keyset_sql(sql, page_tables(info))
+    if paged:
+        sql, cap = paged
+        after, served = decode_cursor(cursor, version, cap) if cursor else (-2 ** 63, 0)
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        if cap is not None:
+            page_size = min(page_size, cap - served)
+        params = [*params, after, page_size + 1]
+    elif "LIMIT" not in sql.upper():
         sql += f" LIMIT {limit}"
-    cursor = conn.execute(sql)
-    cols = [d[0] for d in cursor.description]
-    rows = [dict(r) for r in cursor.fetchall()]
-    conn.close()
-    return {"columns": cols, "rows": rows, "count": len(rows)}
+    key = QueryCache.key(db_name, version, sql, params)
+    if use_cache:
+        cached = query_cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+    with db_pool(db_name).connection() as conn:
+        started, raw = time.perf_counter(), []
+        try:
+            with query_guard.track(conn, endpoint, db_name, sql):
+                cursor = conn.execute(sql, params)
+                cols = [d[0] for d in cursor.description]
+                raw = cursor.fetchall()
+        finally:
+            # queries stopped by their budget are logged too
+            slow_log.record(conn, db_name, sql, params, (time.perf_counter() - started) * 1000, len(raw))
+    next_token = None
+    if paged:
+        if len(raw) > page_size:
+            raw = raw[:page_size]
+            if cap is None or served + page_size < cap:
+                next_token = encode_cursor(version, raw[-1][0], served + page_size)
+        cols, raw = cols[1:], [r[1:] for r in raw]
+    rows = [dict(zip(cols, r)) for r in raw]
+    result = {"columns": cols, "rows": rows, "count": len(rows), "next": next_token}
+    query_cache.put(key, result)
+    return result
+
+def stream_query(db_name, sql, params=()):
+    """NDJSON response: a {"columns"} line, one object per row, then {"count"}.
+
+    Rows are fetched STREAM_BATCH at a time and written as they come, so the
+    server holds one batch in memory whatever the result size. The SQL runs
+    before the response starts, so errors still surface as a 400. A stream
+    that runs out of its budget, or is cancelled, ends with an {"error"} line.
+    """
+    check_query(db_name, sql)
+    def generate():
+        count = 0
+        try:
+            with db_pool(db_name).connection() as conn, query_guard.track(conn, "stream", db_name, sql):
+                cursor = conn.execute(sql, params)
+                cols = [d[0] for d in cursor.description]
+                yield json.dumps({"columns": cols}, ensure_ascii=False) + "\n"
+                while True:
+                    batch = cursor.fetchmany(STREAM_BATCH)
+                    if not batch:
+                        break
+                    count += len(batch)
+                    yield "".join(json.dumps(dict(zip(cols, r)), ensure_ascii=False, default=str) + "\n" for r in batch)
+        except QueryTimeout as e:
+            yield json.dumps({"error": str(e), "count": count}) + "\n"
+            return
+        yield json.dumps({"count": count}) + "\n"
+    rows = generate()
+    first = next(rows)
+    return Response(stream_with_context(itertools.chain([first], rows)), mimetype="application/x-ndjson")
 
 @app.route('/api/health')
 def health():
-    return jsonify({"status": "ok", "databases": len(databases)})
+    return jsonify({"status": "ok", "databases": len(registry.databases), "pools": pool_stats(), "ai_jobs": ai_jobs.stats(),
+                    "queries": query_guard.stats(),
+                    "scanner": {"files": len(source_scanner.files), "scanned_at": source_scanner.scanned_at,
+                                "scan_seconds": source_scanner.scan_seconds, "watching": source_scanner.watching}})
 
 @app.route('/api/databases')
 def list_databases():
-    load_databases()
     dbs = []
-    for name, info in databases.items():
-        dbs.append({"name": name, "columns": info["columns"], "row_count": info["row_count"], "status": info["status"], "source": info["source_path"]})
+    for name, info in registry.databases.items():
+        dbs.append({"name": name, "columns": info["columns"], "row_count": info["row_count"], "status": info["status"], "source": info["source_path"],
+                    "attached": info["immutable"], "table": info["table"], "tables": info["meta"].get("tables")})
     return jsonify(dbs)
 
 @app.route('/api/databases/scan')
 def api_scan():
-    load_databases()
-    return jsonify(scan_files())
+    return jsonify(scan_files(refresh=request.args.get("refresh") == "1"))
+
+@app.route('/api/databases/import', methods=['GET', 'POST'])
+def api_import():
+    if request.method == 'GET':
+        return jsonify(import_queue.list())
+    data = request.json or {}
+    path = Path(data.get("path", ""))
+    name = data.get("name") or source_name(path)
+    try:
+        path = path.resolve()
+        path.relative_to(DATABASES_PATH.resolve())
+    except ValueError:
+        return jsonify({"success": False, "detail": f"Path must be inside {DATABASES_PATH}"}), 400
+    if not path.is_file() or path.suffix.lower() not in IMPORTABLE + COMPRESSED:
+        return jsonify({"success": False, "detail": f"Not an importable file: {path.name}"}), 400
+    if not re.fullmatch(r'[\w\-]+', name):
+        return jsonify({"success": False, "detail": "Name may only contain letters, digits, _ and -"}), 400
+    try:
+        job = import_queue.submit(path, name, data.get("columns"), delta=data.get("mode") == "delta",
+                                  key=data.get("key"), delete_missing=bool(data.get("delete_missing")),
+                                  attach=data.get("mode") == "attach", exact_counts=bool(data.get("exact_counts")))
+    except ValueError as e:
+        return jsonify({"success": False, "detail": str(e)}), 409
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/databases/import/<job_id>')
+def api_import_status(job_id):
+    job = import_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown import job"}), 404
+    return jsonify(job.to_dict())
+
+def present(results):
+    """`results` as sent to the client: column list plus row arrays when the request asks for format=compact."""
+    data = request.get_json(silent=True) or {}
+    if results and "compact" in (data.get("format"), request.args.get("format")):
+        return compact(results)
+    return results
+
+def respond(payload, status=200, endpoint="chat"):
+    """JSON response encoded by serialize.dumps (orjson when installed), gzip/brotli-compressed if accepted."""
+    start = time.perf_counter()
+    body = dumps(payload)
+    metrics.observe("serialize_seconds", time.perf_counter() - start, help="Time to encode JSON responses", endpoint=endpoint)
+    body, encoding = encode(body, request.headers.get("Accept-Encoding"))
+    metrics.inc("response_bytes_total", len(body), help="Bytes sent by JSON endpoints after compression",
+                endpoint=endpoint, encoding=encoding or "identity")
+    resp = Response(body, status=status, mimetype="application/json")
+    resp.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    return resp
+
+def log_exchange(conv_id, msg, response, sql, count):
+    with metrics.span("persist"):
+        message_log.log(conv_id, "user", msg)
+        message_log.log(conv_id, "assistant", response, sql, count)
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -245,62 +355,89 @@ def chat():
     
     if not conv_id:
         conv_id = hashlib.md5(f"{msg}{time.time()}".encode()).hexdigest()[:12]
-        conn = sqlite3.connect(str(INDEX_DB))
-        conn.execute("INSERT INTO conversations (id, title, created_at, updated_at) VALUES (?,?,?,?)",
-            (conv_id, msg[:50], datetime.now().isoformat(), datetime.now().isoformat()))
-        conn.commit()
-        conn.close()
+        message_log.create_conversation(conv_id, msg[:50])
     
     start = time.time()
     
-    db_name = detect_db(msg)
-    if not db_name:
-        return jsonify({"response": "Aucune base importée. Importez d'abord vos fichiers.", "sql": None, "results": None, "time": 0, "conversation_id": conv_id})
+    labels = {"intent": query_intent(msg), "database": None, "mode": "ai" if ai_mode else "lookup"}
+    with metrics.trace() as spans, metrics.timed("chat_seconds", labels, help="Time to answer /api/chat by intent and database"):
+        snap = registry.snapshot()
+        with metrics.span("detect_db"):
+            db_name = detect_db(msg, snap)
+        labels["database"] = db_name
+        if not db_name:
+            return respond({"response": "Aucune base importée. Importez d'abord vos fichiers.", "sql": None, "results": None, "time": 0, "conversation_id": conv_id, "spans": spans})
     
-    columns = databases[db_name]["columns"]
-    sql = parse_query(msg, db_name, columns)
+        info = snap.databases[db_name]
+        with metrics.span("parse_query"):
+            sql, params = parse_query(msg, info["table"], info["columns"], info["meta"], snap.derived["profiles"].get(db_name))
+            # row lookups are paged by "Load more" instead of stopping at parse_query's LIMIT
+            sql = without_limit(sql, page_tables(info))
     
-    try:
-        results = run_query(db_name, sql)
-    except Exception as e:
-        return jsonify({"response": f"Erreur SQL: {e}", "sql": sql, "results": None, "time": 0, "conversation_id": conv_id})
+        try:
+            with metrics.span("run_query"):
+                results = run_query(db_name, sql, params, page_size=PAGE_SIZE, endpoint="chat")
+        except QueryTimeout as e:
+            return respond({"response": f"Recherche trop longue, interrompue : {e}", "sql": sql, "params": params, "results": None, "time": round(time.time() - start, 3), "conversation_id": conv_id, "spans": spans, "timeout": True})
+        except Exception as e:
+            return respond({"response": f"Erreur SQL: {e}", "sql": sql, "params": params, "results": None, "time": 0, "conversation_id": conv_id, "spans": spans})
     
-    elapsed = round(time.time() - start, 3)
+        elapsed = round(time.time() - start, 3)
     
-    if not ai_mode:
-        response = format_response(msg, results, db_name, elapsed)
-        conn = sqlite3.connect(str(INDEX_DB))
-        conn.execute("INSERT INTO messages (conversation_id, role, content, sql_query, results_count, created_at) VALUES (?,?,?,?,?,?)",
-            (conv_id, "user", msg, None, None, datetime.now().isoformat()))
-        conn.execute("INSERT INTO messages (conversation_id, role, content, sql_query, results_count, created_at) VALUES (?,?,?,?,?,?)",
-            (conv_id, "assistant", response, sql, results["count"], datetime.now().isoformat()))
-        conn.commit()
-        conn.close()
-        return jsonify({"response": response, "sql": sql, "results": results, "database": db_name, "time": elapsed, "conversation_id": conv_id, "osint": None})
+        if not ai_mode:
+            with metrics.span("format_response"):
+                response = format_response(msg, results, db_name, elapsed)
+            log_exchange(conv_id, msg, response, sql, results["count"])
+            return respond({"response": response, "sql": sql, "params": params, "results": present(results), "database": db_name, "time": elapsed, "conversation_id": conv_id, "spans": spans, "osint": None})
+    
+        if not results["count"]:
+            response = f"Aucun résultat en base pour cette recherche dans **{db_name}**. Essayez un autre nom."
+            log_exchange(conv_id, msg, response, sql, 0)
+            return respond({"response": response, "sql": sql, "params": params, "results": present(results), "database": db_name, "time": elapsed, "conversation_id": conv_id, "spans": spans, "osint": None})
     
-    osint = None
-    if results["count"] > 0:
-        person = results["rows"][0]
+        try:
+            job = ai_jobs.submit("osint", traced_report, msg, conv_id, db_name, sql, results, start, not data.get("no_cache"))
+        except QueueFull:
+            response = "Le mode IA est saturé, réessayez dans quelques secondes. Résultats de la base ci-dessous."
+            log_exchange(conv_id, msg, response, sql, results["count"])
+            return respond({"response": response, "sql": sql, "params": params, "results": present(results), "database": db_name, "time": elapsed, "conversation_id": conv_id, "spans": spans, "osint": None, "busy": True}), 429
+        return respond({"response": None, "sql": sql, "params": params, "results": present(results), "database": db_name, "time": elapsed, "conversation_id": conv_id, "spans": spans, "osint": None, "job": job.to_dict()}), 202
+
+
+def traced_report(job, msg, conv_id, db_name, *args):
+    """osint_report with its stage spans added to the result."""
+    with metrics.trace() as spans, metrics.timed("report_seconds", {"database": db_name}, help="Time to build an AI-mode report"):
+        result = osint_report(job, msg, conv_id, db_name, *args)
+    return {**result, "spans": spans}
+
+def osint_report(job, msg, conv_id, db_name, sql, results, start, use_cache=True):
+    """AI-mode work for a chat answer: OSINT scan of the first row, then the Ollama summary."""
+    job.emit("progress", stage="osint")
+    person = results["rows"][0]
+    with metrics.span("run_deep_osint"):
         osint = run_deep_osint(person, results["rows"][:5])
+    elapsed = round(time.time() - start, 3)
+    ttft = []
+    
+    if osint:
+        stats = osint.get("stats", {})
+        scan_time = osint.get("scan_time", 0)
         
-        if osint:
-            stats = osint.get("stats", {})
-            scan_time = osint.get("scan_time", 0)
+        summary = None
+        job.emit("progress", stage="summary")
+        try:
+            person_json = json.dumps(person, ensure_ascii=False, indent=2)[:1000]
+            social_found = [p for p in osint.get("social_profiles", []) if p.get("exists")]
+            social_str = ", ".join([f"{p['platform']} ({p['url']})" for p in social_found]) if social_found else "Aucun profil confirmé"
+            breach_str = f"{stats.get('breaches', 0)} breach(es) trouvée(s)" if stats.get('breaches') else "Aucune breach connue"
+            google_str = f"{stats.get('google_hits', 0)} résultats Google"
             
-            summary = None
-            try:
-                person_json = json.dumps(person, ensure_ascii=False, indent=2)[:1000]
-                social_found = [p for p in osint.get("social_profiles", []) if p.get("exists")]
-                social_str = ", ".join([f"{p['platform']} ({p['url']})" for p in social_found]) if social_found else "Aucun profil confirmé"
-                breach_str = f"{stats.get('breaches', 0)} breach(es) trouvée(s)" if stats.get('breaches') else "Aucune breach connue"
-                google_str = f"{stats.get('google_hits', 0)} résultats Google"
-                
-                prompt = f"""Analyse OSINT complète pour cette personne.
+            prompt = f"""Analyse OSINT complète pour cette personne.
 
 Données DB:
 {person_json}
 
-Résultats du scan OSINT ({scan_time}s):
+Résultats du scan OSINT:
 - Google: {google_str}
 - Réseaux sociaux confirmés: {social_str}
 - Data breaches: {breach_str}
@@ -318,23 +455,30 @@ Génère un rapport OSINT professionnel en markdown:
 6. **Évaluation** - Niveau d'exposition numérique (faible/moyen/élevé)
 
 Sois factuel et concis."""
-                
-                summary = ollama_generate(prompt, "Tu es un analyste OSINT senior. Rapports structurés, factuels, markdown.", timeout=20)
-            except:
-                pass
             
-            if not summary:
-                name = osint.get("name", "")
-                email = osint.get("email", "")
-                phone = osint.get("phone", "")
-                city = osint.get("city", "")
-                address = osint.get("address", "")
-                cp = osint.get("code_postal", "")
-                ei = osint.get("email_info", {})
-                pi = osint.get("phone_info", {})
-                social_found = [p for p in osint.get("social_profiles", []) if p.get("exists")]
-                
-                summary = f"""## Rapport OSINT - {name}
+            asked = time.time()
+            def on_token(text):
+                if not ttft:
+                    ttft.append(round(time.time() - asked, 3))
+                    job.emit("progress", stage="streaming", ttft=ttft[0])
+                job.emit("token", text=text)
+            with metrics.span("ollama_generate"):
+                summary = ollama_generate(prompt, "Tu es un analyste OSINT senior. Rapports structurés, factuels, markdown.", timeout=20, on_token=on_token, use_cache=use_cache)
+        except:
+            pass
+        
+        if not summary:
+            name = osint.get("name", "")
+            email = osint.get("email", "")
+            phone = osint.get("phone", "")
+            city = osint.get("city", "")
+            address = osint.get("address", "")
+            cp = osint.get("code_postal", "")
+            ei = osint.get("email_info", {})
+            pi = osint.get("phone_info", {})
+            social_found = [p for p in osint.get("social_profiles", []) if p.get("exists")]
+            
+            summary = f"""## Rapport OSINT - {name}
 
 ### Identité
 - **Nom**: {name}
@@ -359,33 +503,63 @@ Sois factuel et concis."""
 ### Scan
 - **Temps**: {scan_time}s
 - **{results['count']}** entrée(s) en base de données"""
-            
-            osint["summary"] = summary
-            elapsed = round(time.time() - start, 3)
-            response = f"*{results['count']} entrée(s) en base • Scan OSINT: {scan_time}s • Total: {elapsed}s*\n\n{summary}"
-        else:
-            response = format_response(msg, results, db_name, elapsed)
+        
+        osint["summary"] = summary
+        elapsed = round(time.time() - start, 3)
+        response = f"*{results['count']} entrée(s) en base • Scan OSINT: {scan_time}s • Total: {elapsed}s*\n\n{summary}"
     else:
-        response = f"Aucun résultat en base pour cette recherche dans **{db_name}**. Essayez un autre nom."
-    
-    conn = sqlite3.connect(str(INDEX_DB))
-    conn.execute("INSERT INTO messages (conversation_id, role, content, sql_query, results_count, created_at) VALUES (?,?,?,?,?,?)",
-        (conv_id, "user", msg, None, None, datetime.now().isoformat()))
-    conn.execute("INSERT INTO messages (conversation_id, role, content, sql_query, results_count, created_at) VALUES (?,?,?,?,?,?)",
-        (conv_id, "assistant", response, sql, results["count"], datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
+        response = format_response(msg, results, db_name, elapsed)
     
-    return jsonify({"response": response, "sql": sql, "results": results, "database": db_name, "time": elapsed, "conversation_id": conv_id, "osint": osint})
-
-def ollama_generate(prompt, system="", timeout=15):
+    log_exchange(conv_id, msg, response, sql, results["count"])
+    return {"response": response, "osint": osint, "time": elapsed, "ttft": ttft[0] if ttft else None}
+
+ollama_client = httpx.Client(base_url=OLLAMA_URL, limits=httpx.Limits(max_keepalive_connections=AI_WORKERS, keepalive_expiry=300))
+
+def ollama_generate(prompt, system="", timeout=15, on_token=None, use_cache=True):
+    """Generate with Ollama over the shared keep-alive client.
+
+    With `on_token`, the response is streamed and each chunk is passed to it
+    as it arrives; `timeout` then bounds the wait for each chunk rather than
+    the whole generation. Answers are cached by (model, system, prompt); a hit
+    is handed to `on_token` in one piece. Returns the full text, or None on
+    failure.
+    """
+    key = SummaryCache.key(OLLAMA_MODEL, system, prompt)
+    if use_cache:
+        cached = summary_cache.get(key)
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return cached
+    text = _ollama_request(prompt, system, timeout, on_token)
+    if text:
+        summary_cache.put(key, OLLAMA_MODEL, text)
+    return text
+
+def _ollama_request(prompt, system, timeout, on_token):
+    body = {"model": OLLAMA_MODEL, "prompt": prompt, "system": system, "keep_alive": OLLAMA_KEEP_ALIVE,
+            "stream": on_token is not None, "options": {"temperature": 0.3, "num_predict": 2048}}
     try:
-        r = httpx.post(f"{OLLAMA_URL}/api/generate", json={
-            "model": OLLAMA_MODEL, "prompt": prompt, "system": system,
-            "stream": False, "options": {"temperature": 0.3, "num_predict": 2048}
-        }, timeout=timeout)
-        if r.status_code == 200:
-            return r.json().get("response", "")
+        if on_token is None:
+            r = ollama_client.post("/api/generate", json=body, timeout=timeout)
+            if r.status_code == 200:
+                return r.json().get("response", "")
+            return None
+        parts, done = [], False
+        with ollama_client.stream("POST", "/api/generate", json=body, timeout=timeout) as r:
+            if r.status_code != 200:
+                return None
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    parts.append(chunk["response"])
+                    on_token(chunk["response"])
+                if chunk.get("done"):
+                    done = True
+                    break
+        return "".join(parts) if done else None
     except:
         pass
     return None
@@ -394,44 +568,153 @@ def ollama_generate(prompt, system="", timeout=15):
 def raw_query():
     data = request.json
     try:
-        return jsonify(run_query(data["database"], data["sql"]))
+        if data.get("stream") or request.accept_mimetypes.best == "application/x-ndjson":
+            return stream_query(data["database"], data["sql"], data.get("params") or ())
+        with metrics.timed("query_seconds", {"database": data["database"]}, help="Time to answer /api/query"):
+            result = run_query(data["database"], data["sql"], data.get("params") or (), use_cache=not data.get("no_cache"),
+                               cursor=data.get("cursor"), page_size=data.get("page_size"))
+        return respond(present(result), endpoint="query")
+    except QueryTimeout as e:
+        return jsonify({"error": str(e), "timeout": True, "cancelled": e.cancelled}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/api/queries')
+def list_queries():
+    """Queries running right now, oldest first, with their budgets."""
+    return jsonify({"stats": query_guard.stats(), "queries": query_guard.list()})
+
+@app.route('/api/queries/<query_id>', methods=['DELETE'])
+def cancel_query(query_id):
+    if not query_guard.cancel(query_id):
+        return jsonify({"error": "Unknown or finished query"}), 404
+    return jsonify({"success": True})
+
+@app.route('/api/jobs')
+def list_jobs():
+    return jsonify({"stats": ai_jobs.stats(), "jobs": ai_jobs.list()})
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = ai_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events for a job: status, progress stages, then done or error."""
+    job = ai_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    def generate():
+        seen = 0
+        while True:
+            events = job.wait_events(seen)
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for e in events:
+                yield f"event: {e['event']}\ndata: {json.dumps(e['data'], ensure_ascii=False)}\n\n"
+                if e["event"] in ("done", "error"):
+                    return
+            seen += len(events)
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/cache', methods=['GET', 'DELETE'])
+def cache_stats():
+    if request.method == 'DELETE':
+        query_cache.invalidate(request.args.get("database"))
+    return jsonify(query_cache.stats())
+
+@app.route('/api/cache/summaries', methods=['GET', 'DELETE'])
+def summary_cache_stats():
+    if request.method == 'DELETE':
+        summary_cache.clear()
+    return jsonify(summary_cache.stats())
+
 @app.route('/api/conversations')
 def list_conversations():
+    """Most recently active first; pass the last `updated_at` seen as `before` for the next page."""
+    message_log.flush()
+    limit = min(request.args.get("limit", 50, type=int), 500)
+    before = request.args.get("before")
     conn = sqlite3.connect(str(INDEX_DB))
     conn.row_factory = sqlite3.Row
-    rows = conn.execute("SELECT * FROM conversations ORDER BY updated_at DESC LIMIT 50").fetchall()
+    if before:
+        rows = conn.execute("SELECT * FROM conversations WHERE updated_at < ? ORDER BY updated_at DESC LIMIT ?", (before, limit)).fetchall()
+    else:
+        rows = conn.execute("SELECT * FROM conversations ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
     conn.close()
     return jsonify([dict(r) for r in rows])
 
 @app.route('/api/conversations/<conv_id>/messages')
 def get_messages(conv_id):
+    """Latest `limit` messages in order; pass the first `id` seen as `before` for older ones."""
+    message_log.flush()
+    limit = min(request.args.get("limit", 200, type=int), 1000)
+    before = request.args.get("before", type=int)
     conn = sqlite3.connect(str(INDEX_DB))
     conn.row_factory = sqlite3.Row
-    rows = conn.execute("SELECT * FROM messages WHERE conversation_id=? ORDER BY created_at ASC", (conv_id,)).fetchall()
+    rows = conn.execute("""SELECT * FROM messages WHERE conversation_id = ? AND id < ?
+        ORDER BY id DESC LIMIT ?""", (conv_id, before if before is not None else 2 ** 63 - 1, limit)).fetchall()
     conn.close()
-    return jsonify([dict(r) for r in rows])
+    return jsonify([dict(r) for r in reversed(rows)])
+
+@app.route('/api/slow-queries', methods=['GET', 'DELETE'])
+def slow_queries():
+    """Logged slow query shapes, most total time first; DELETE clears them (optionally for one ?database=)."""
+    database = request.args.get("database")
+    if request.method == 'DELETE':
+        slow_log.clear(database)
+    return jsonify({"threshold_ms": slow_log.threshold_ms, "queries": slow_log.list(database, request.args.get("limit", 100, type=int))})
+
+@app.route('/api/metrics')
+def prometheus_metrics():
+    """Latency histograms plus cache, pool, queue and query-guard gauges in Prometheus text format."""
+    cache, guard, ai = query_cache.stats(), query_guard.stats(), ai_jobs.stats()
+    pools = pool_stats()
+    imports = [j["status"] for j in import_queue.list()]
+    gauges = {
+        "databases": len(registry.databases),
+        "query_cache_entries": cache["entries"],
+        "query_cache_bytes": cache["bytes"],
+        "pool_connections_open": [({"database": n}, p["opened"]) for n, p in pools.items()],
+        "pool_connections_idle": [({"database": n}, p["idle"]) for n, p in pools.items()],
+        "ai_jobs": [({"status": "queued"}, ai["queued"]), ({"status": "running"}, ai["running"])],
+        "imports": [({"status": st}, imports.count(st)) for st in ("queued", "running")],
+        "queries_running": guard["running"],
+        "source_files": len(source_scanner.files),
+    }
+    totals = {
+        "query_cache_hits_total": cache["hits"],
+        "query_cache_misses_total": cache["misses"],
+        "query_cache_evictions_total": cache["evictions"],
+        "summary_cache_hits_total": summary_cache.hits,
+        "summary_cache_misses_total": summary_cache.misses,
+        "query_timeouts_total": guard["timeouts"],
+        "queries_cancelled_total": guard["cancelled"],
+        "slow_queries_total": slow_log.logged,
+    }
+    return Response(metrics.render(gauges, totals), mimetype="text/plain; version=0.0.4")
 
 @app.route('/api/stats')
 def get_stats():
-    load_databases()
-    total_rows = sum(d["row_count"] for d in databases.values())
-    conn = sqlite3.connect(str(INDEX_DB))
-    total_queries = conn.execute("SELECT COUNT(*) FROM messages WHERE role='user'").fetchone()[0]
-    total_convs = conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
-    conn.close()
-    return jsonify({"total_databases": len(databases), "total_records": total_rows, "total_queries": total_queries, "total_conversations": total_convs})
+    message_log.flush()
+    stats = read_stats(INDEX_DB)
+    return jsonify({"total_databases": stats.get("databases", 0), "total_records": stats.get("records", 0),
+                    "total_queries": stats.get("queries", 0), "total_conversations": stats.get("conversations", 0)})
 
 if __name__ == "__main__":
+    create_app()
     print(f"""
     ╔═══════════════════════════════════════════════════════════╗
     ║                  DataChat Server                          ║
     ║            Ultra-Fast Local Engine                        ║
     ╠═══════════════════════════════════════════════════════════╣
     ║  [*] API: http://localhost:8000                          ║
-    ║  [*] Databases loaded: {str(len(databases)):<30s}  ║
+    ║  [*] Databases loaded: {str(len(registry.databases)):<30s}  ║
     ╚═══════════════════════════════════════════════════════════╝
     """)
-    app.run(host="0.0.0.0", port=8000, debug=False)
+    app.run(host="0.0.0.0", port=8000, debug=False, threaded=True)
@@ -0,0 +1,74 @@
+"""Compare the LIKE and FTS5 trigram name-search paths of parse_query.
+
+Usage (from server/):  python -m bench.fts_vs_like [--rows 5000000] [--db path]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from itertools import islice
+
+from nlp_engine import parse_query
+from search_index import build_fts
+from bench.generator import COLUMNS, records
+
+QUERIES = ["DUPONT", "JEAN MARTIN", "CAMILLE FOURNIER", "ZZQXW", "LAMBERT1234"]
+
+def generate(path, rows, seed=42):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute('CREATE TABLE "bench" (' + ", ".join([f'"{c}" TEXT' for c in COLUMNS]) + ")")
+    rows = records(rows, seed)
+    while True:
+        batch = list(islice(rows, 100000))
+        if not batch:
+            break
+        conn.executemany('INSERT INTO "bench" VALUES (?,?,?,?,?,?,?,?)', batch)
+    conn.execute('CREATE INDEX "idx_bench_nom" ON "bench" ("nom")')
+    conn.commit()
+    return conn
+
+def timed(conn, query, repeat):
+    sql, params = query
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        n = len(conn.execute(sql, params).fetchall())
+        dt = time.perf_counter() - t
+        best = dt if best is None else min(best, dt)
+    return best, n
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--db", help="keep the generated database at this path")
+    args = ap.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    if os.path.exists(path):
+        conn = sqlite3.connect(path)
+    else:
+        t = time.perf_counter()
+        conn = generate(path, args.rows)
+        print(f"[*] Generated {args.rows:,} rows in {time.perf_counter() - t:.1f}s -> {path}")
+    t = time.perf_counter()
+    fts = build_fts(conn, "bench", COLUMNS)
+    if not fts:
+        sys.exit("FTS5 trigram tokenizer not available in this SQLite build")
+    print(f"[*] Built FTS index in {time.perf_counter() - t:.1f}s\n")
+
+    print(f"{'query':<20} {'LIKE (s)':>10} {'FTS (s)':>10} {'speedup':>9} {'rows':>6}")
+    for q in QUERIES:
+        like_t, like_n = timed(conn, parse_query(q, "bench", COLUMNS), args.repeat)
+        fts_t, fts_n = timed(conn, parse_query(q, "bench", COLUMNS, {"fts": fts}), args.repeat)
+        print(f"{q:<20} {like_t:>10.4f} {fts_t:>10.4f} {like_t / fts_t:>8.1f}x {fts_n:>6}")
+        if like_n != fts_n and max(like_n, fts_n) < 50:
+            print(f"  [!] row count differs: LIKE={like_n} FTS={fts_n}")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Deterministic fake person records in the import_demo.py column layout.
+
+Usage (from server/):  python -m bench.generator out.csv [--rows 10m] [--seed 42]
+
+Writes a header-less, fully quoted CSV like demo_data.csv; the same seed and
+size always produce the same file.
+"""
+import argparse
+import csv
+import random
+import time
+
+COLUMNS = ["nom", "email", "telephone", "adresse", "complement", "code_postal", "ville", "pays"]
+SIZES = {"1m": 1_000_000, "10m": 10_000_000, "50m": 50_000_000}
+FIRST = ["JEAN", "MARIE", "PIERRE", "SOPHIE", "LUCAS", "EMMA", "HUGO", "CHLOE", "LOUIS", "LEA",
+         "JOHN", "JANE", "ALICE", "BOB", "CHARLIE", "NATHAN", "CAMILLE", "THOMAS", "MANON", "ENZO"]
+LAST = ["MARTIN", "BERNARD", "DUBOIS", "THOMAS", "ROBERT", "RICHARD", "PETIT", "DURAND", "LEROY",
+        "MOREAU", "SIMON", "LAURENT", "LEFEBVRE", "MICHEL", "GARCIA", "DAVID", "BERTRAND", "ROUX",
+        "VINCENT", "FOURNIER", "MOREL", "GIRARD", "ANDRE", "MERCIER", "DUPONT", "LAMBERT", "BONNET"]
+CITIES = [("PARIS", "75"), ("LYON", "69"), ("MARSEILLE", "13"), ("TOULOUSE", "31"), ("NICE", "06"),
+          ("NANTES", "44"), ("STRASBOURG", "67"), ("LILLE", "59"), ("RENNES", "35"), ("BORDEAUX", "33")]
+STREETS = ["RUE DE LA PAIX", "AVENUE DES CHAMPS ELYSEES", "BOULEVARD HAUSSMANN", "RUE DE RIVOLI",
+           "PLACE BELLECOUR", "RUE SAINTE-CATHERINE", "COURS MIRABEAU", "RUE NATIONALE"]
+DOMAINS = ["gmail.com", "outlook.com", "yahoo.fr", "orange.fr", "free.fr", "hotmail.fr"]
+
+def parse_size(value):
+    """'10m', '1m' or a plain number of rows."""
+    return SIZES.get(value.lower()) or int(value.replace("_", ""))
+
+def records(rows, seed=42):
+    """Yield `rows` records as lists of strings, in COLUMNS order."""
+    rnd = random.Random(seed)
+    for i in range(rows):
+        first, last = rnd.choice(FIRST), rnd.choice(LAST)
+        if rnd.random() < 0.3:
+            last += str(rnd.randint(0, 9999))
+        city, dept = rnd.choice(CITIES)
+        complement = f"APT {rnd.randint(1, 60)}{rnd.choice('ABC')}" if rnd.random() < 0.2 else ""
+        yield [f"{first} {last}", f"{first.lower()}.{last.lower()}{i}@{rnd.choice(DOMAINS)}",
+               f"+336{rnd.randint(10000000, 99999999)}", f"{rnd.randint(1, 200)} {rnd.choice(STREETS)}",
+               complement, f"{dept}{rnd.randint(1, 20):03d}", city, "FRA"]
+
+def write_csv(path, rows, seed=42):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f, quoting=csv.QUOTE_ALL).writerows(records(rows, seed))
+    return path
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("output")
+    ap.add_argument("--rows", type=parse_size, default=SIZES["1m"], help="row count, or 1m / 10m / 50m")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    t = time.perf_counter()
+    write_csv(args.output, args.rows, args.seed)
+    print(f"[*] Wrote {args.rows:,} rows to {args.output} in {time.perf_counter() - t:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Per-message overhead of parse_query and detect_db, with and without compiled profiles.
+
+"before" derives the column roles and SELECT list on every message and scans
+every database name in a Python loop; "after" reuses the compiled schema
+profile and the DbMatcher built at registry load.
+
+Usage (from server/):  python -m bench.parse_overhead [--messages 20000] [--databases 200]
+"""
+import argparse
+import time
+
+from nlp_engine import parse_query, DbMatcher
+from schema_profile import build_profile
+
+COLUMNS = ["nom", "prenom", "email", "telephone", "adresse", "complement", "code_postal", "ville", "pays",
+           "date_naissance", "matricule", "organisme"] + [f"champ_{i}" for i in range(28)]
+META = {"shadow": {"nom": "nom__n", "prenom": "prenom__n", "email": "email__n",
+                   "telephone": "telephone__n", "code_postal": "code_postal__n"}}
+MESSAGES = ["cherche DUPONT", "JEAN MARTIN", "jean.dupont@example.com", "06 12 34 56 78",
+            "combien de personnes à Lyon", "combien dans le 75", "liste 75011", "donne moi tout"]
+
+def legacy_detect(databases, query):
+    q = query.lower()
+    for name in databases:
+        if name.lower() in q:
+            return name
+    if any(kw in q for kw in ['caf', 'allocataire', 'aah', 'organisme']):
+        for name, info in databases.items():
+            if any('matricule' in c for c in info["columns"]):
+                return name
+    ready = [n for n in databases if databases[n]["status"] == "ready"]
+    return ready[0] if ready else None
+
+def per_message(fn, messages):
+    t = time.perf_counter()
+    for m in messages:
+        fn(m)
+    return (time.perf_counter() - t) / len(messages) * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=20000)
+    ap.add_argument("--databases", type=int, default=200)
+    args = ap.parse_args()
+
+    messages = [MESSAGES[i % len(MESSAGES)] for i in range(args.messages)]
+    databases = {f"base_{i:04d}": {"columns": COLUMNS, "status": "ready"} for i in range(args.databases)}
+    profiles = {name: build_profile(COLUMNS, META, table=name) for name in databases}
+    matcher = DbMatcher(databases, profiles)
+    profile = profiles["base_0000"]
+
+    rows = [
+        ("parse_query", per_message(lambda m: parse_query(m, "base_0000", COLUMNS, META), messages),
+         per_message(lambda m: parse_query(m, "base_0000", COLUMNS, META, profile), messages)),
+        ("detect_db", per_message(lambda m: legacy_detect(databases, m), messages),
+         per_message(matcher.match, messages)),
+    ]
+    print(f"{args.messages} messages, {len(COLUMNS)} columns, {args.databases} databases")
+    print(f"{'step':<12} {'before us/msg':>14} {'after us/msg':>14} {'speedup':>8}")
+    for step, before, after in rows:
+        print(f"{step:<12} {before:>14.1f} {after:>14.1f} {before / after:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""End-to-end benchmark: generate, import, then time each chat intent through run_query.
+
+Usage (from server/):
+    python -m bench.suite [--rows 1m] [--repeat 5] [--output report.json]
+    python -m bench.suite --rows 10m --baseline baseline.json [--threshold 0.25]
+
+The generated CSV and the imported database are kept in --workdir and
+reused by later runs of the same size and seed (--skip-import times the
+queries only). The JSON report can be saved as a baseline; comparing against
+one prints each metric's change and exits with status 1 when any got slower
+than the threshold allows. The report also gives the response size and
+encode time of a full results page, as dicts and in the compact format.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from importer import import_file
+from bench.generator import COLUMNS, parse_size, write_csv
+from serialize import compact, dumps, encode
+
+TABLE = "bench"
+MIN_DELTA_MS = 1.0  # query slowdowns smaller than this are noise, whatever the ratio
+
+def probe(db_path, rows):
+    """Values of a record in the middle of the table, so lookups have a hit."""
+    conn = sqlite3.connect(db_path)
+    row = conn.execute(f'SELECT nom, email, telephone, code_postal, ville FROM "{TABLE}" WHERE rowid = ?',
+                       (max(1, rows // 2),)).fetchone()
+    conn.close()
+    return dict(zip(["nom", "email", "telephone", "code_postal", "ville"], row))
+
+def scenarios(p):
+    """{scenario: chat message}, one per parse_query intent."""
+    first, last = p["nom"].split(" ", 1)
+    return {
+        "count_postcode": f"combien de personnes au {p['code_postal']}",
+        "count_department": f"combien dans le {p['code_postal'][:2]}",
+        "count_city": f"combien à {p['ville']}",
+        "count_total": "combien au total",
+        "email": p["email"],
+        "phone": p["telephone"],
+        "name": f"{first} {last}",
+        "name_miss": "ZZQXW QWERTY",
+    }
+
+def time_queries(app, messages, repeat):
+    from nlp_engine import parse_query, query_intent
+    snap = app.registry.snapshot()
+    info = snap.databases[TABLE]
+    profile = snap.derived["profiles"].get(TABLE)
+    results = {}
+    for name, msg in messages.items():
+        sql, params = parse_query(msg, TABLE, info["columns"], info["meta"], profile)
+        times, count = [], 0
+        for _ in range(repeat):
+            t = time.perf_counter()
+            result = app.run_query(TABLE, sql, params, page_size=app.PAGE_SIZE, use_cache=False, endpoint="bench")
+            times.append((time.perf_counter() - t) * 1000)
+        count = result["count"]
+        times.sort()
+        results[name] = {"message": msg, "intent": query_intent(msg), "sql": sql, "rows": count,
+                         "bytes": len(dumps(result)), "compact_bytes": len(dumps(compact(result))),
+                         "min_ms": round(times[0], 3), "median_ms": round(statistics.median(times), 3),
+                         "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3)}
+        print(f"  {name:<18} {results[name]['median_ms']:>10.2f} ms  ({count} rows)")
+    return results
+
+def time_payload(app, repeat):
+    """Size and encode time of one MAX_PAGE_SIZE page of rows, per response format."""
+    result = app.run_query(TABLE, f'SELECT * FROM "{TABLE}"', page_size=app.MAX_PAGE_SIZE, use_cache=False, endpoint="bench")
+    encoders = {"json_dicts": lambda: json.dumps(result, ensure_ascii=False).encode(),
+                "dicts": lambda: dumps(result),
+                "compact": lambda: dumps(compact(result))}
+    payload = {"rows": result["count"]}
+    for fmt, encoder in encoders.items():
+        times = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            body = encoder()
+            times.append((time.perf_counter() - t) * 1000)
+        payload[fmt] = {"bytes": len(body), "gzip_bytes": len(encode(body, "gzip")[0]),
+                        "br_bytes": len(encode(body, "br")[0]), "encode_ms": round(statistics.median(times), 3)}
+        print(f"  {fmt:<12} {payload[fmt]['bytes']:>10,} B  gzip {payload[fmt]['gzip_bytes']:>9,} B  "
+              f"br {payload[fmt]['br_bytes']:>9,} B  {payload[fmt]['encode_ms']:>8.2f} ms")
+    return payload
+
+def compare(report, baseline, threshold):
+    """Print current vs baseline for every shared metric; returns the regressed ones."""
+    pairs = []
+    if report.get("import") and baseline.get("import"):
+        pairs.append(("import", baseline["import"]["seconds"], report["import"]["seconds"], "s", 0.0))
+    for name, s in report["scenarios"].items():
+        if name in baseline.get("scenarios", {}):
+            pairs.append((name, baseline["scenarios"][name]["median_ms"], s["median_ms"], "ms", MIN_DELTA_MS))
+    if report.get("payload") and baseline.get("payload"):
+        pairs.append(("encode_compact", baseline["payload"]["compact"]["encode_ms"], report["payload"]["compact"]["encode_ms"], "ms", MIN_DELTA_MS))
+    if baseline.get("rows") != report["rows"]:
+        print(f"[!] baseline has {baseline.get('rows'):,} rows, this run {report['rows']:,}")
+    regressed = []
+    print(f"\n{'metric':<18} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, old, new, unit, min_delta in pairs:
+        change = (new - old) / old if old else 0.0
+        slower = change > threshold and new - old > min_delta
+        if slower:
+            regressed.append(name)
+        print(f"{name:<18} {old:>10.2f}{unit:>2} {new:>10.2f}{unit:>2} {change:>+7.0%}{'  REGRESSION' if slower else ''}")
+    return regressed
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=parse_size, default=parse_size("1m"), help="row count, or 1m / 10m / 50m")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--repeat", type=int, default=5, help="runs per query scenario")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) - 1), help="import parser processes")
+    ap.add_argument("--workdir", default="bench_data")
+    ap.add_argument("--skip-import", action="store_true", help="reuse the database imported by an earlier run")
+    ap.add_argument("--output", help="write the JSON report here")
+    ap.add_argument("--baseline", help="compare against this saved report")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before a metric counts as a regression")
+    args = ap.parse_args()
+
+    work = Path(args.workdir) / f"{args.rows}_{args.seed}"
+    work.mkdir(parents=True, exist_ok=True)
+    source, db_dir, index_db = work / "people.csv", work / "db", work / "index.db"
+    report = {"created": datetime.now().isoformat(), "rows": args.rows, "seed": args.seed,
+              "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+              "platform": platform.platform(), "import": None, "scenarios": {}, "payload": None}
+
+    if not source.exists():
+        t = time.perf_counter()
+        write_csv(source, args.rows, args.seed)
+        print(f"[*] Generated {args.rows:,} rows in {time.perf_counter() - t:.1f}s -> {source}")
+    if not args.skip_import or not index_db.exists():
+        print(f"[*] Importing with {args.workers} parser process(es)...")
+        t = time.perf_counter()
+        import_file(source, TABLE, COLUMNS, db_dir=db_dir, index_db=index_db, parse_workers=args.workers)
+        seconds = time.perf_counter() - t
+        report["import"] = {"seconds": round(seconds, 2), "rows_per_s": int(args.rows / seconds),
+                            "source_mb": round(source.stat().st_size / 2 ** 20, 1),
+                            "db_mb": round((db_dir / f"{TABLE}.db").stat().st_size / 2 ** 20, 1),
+                            "workers": args.workers}
+        print(f"  {seconds:.1f}s ({report['import']['rows_per_s']:,} rows/s)")
+
+    import app
+    app.create_app(db_dir=db_dir, index_db=index_db, databases_path=work)  # logs and caches go to the bench index DB
+    print(f"[*] Timing queries (median of {args.repeat}):")
+    report["scenarios"] = time_queries(app, scenarios(probe(db_dir / f"{TABLE}.db", args.rows)), args.repeat)
+    print(f"[*] Encoding a {app.MAX_PAGE_SIZE:,}-row page (br is the raw size when brotli is not installed):")
+    report["payload"] = time_payload(app, args.repeat)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"[*] Report written to {args.output}")
+    if args.baseline:
+        regressed = compare(report, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if regressed:
+            print(f"\n[!] {len(regressed)} regression(s): {', '.join(regressed)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Read gz / bz2 / xz files and zip / 7z archives as streams, without extracting them.
+
+A DecompressStream decompresses on a background thread (7z: in a `7z x -so`
+child process) into a small queue of chunks, so decompression overlaps with
+the parsing done by the reader. Its `tell()` is the number of *compressed*
+bytes consumed, which is what import progress is measured in.
+
+Archives are read one member at a time: the largest one with an importable
+extension.
+"""
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import zipfile
+from pathlib import Path
+
+COMPRESSED = ['.gz', '.bz2', '.xz', '.zip', '.7z']
+ARCHIVES = ['.zip', '.7z']
+FORMATS = ['.csv', '.json', '.jsonl', '.ndjson', '.txt', '.db', '.sqlite', '.sqlite3']  # what importer.open_source reads
+STREAM_CHUNK = 1024 * 1024  # decompressed bytes per queued chunk
+STREAM_QUEUE = 8  # chunks decompressed ahead of the reader
+GZIP_TRUSTED_BYTES = 256 * 1024 * 1024  # gzip stores the size mod 4 GiB; only trusted below this compressed size
+DEFLATE_MAX_RATIO = 1032
+SEVEN_ZIP = shutil.which("7zz") or shutil.which("7z") or shutil.which("7za")
+
+def compression(path):
+    """The compression suffix of `path` ('.gz', '.zip'...), or None for a plain file."""
+    ext = Path(path).suffix.lower()
+    return ext if ext in COMPRESSED else None
+
+def members(path):
+    """[(name, uncompressed size)] of the files in a zip or 7z archive."""
+    ext = compression(path)
+    if ext == '.zip':
+        with zipfile.ZipFile(path) as zf:
+            return [(i.filename, i.file_size) for i in zf.infolist() if not i.is_dir()]
+    if ext == '.7z':
+        if not SEVEN_ZIP:
+            raise ValueError("Reading .7z archives needs the 7z command (7-Zip / p7zip) on the PATH")
+        out = subprocess.run([SEVEN_ZIP, "l", "-slt", str(path)], capture_output=True, text=True, check=True).stdout
+        found, entry = [], {}
+        # technical listing: "key = value" blocks, one per member, after a "----------" line
+        for line in out.split("----------", 1)[-1].splitlines() + [""]:
+            if " = " in line:
+                key, value = line.split(" = ", 1)
+                entry[key] = value
+            elif entry:
+                if "Path" in entry and entry.get("Folder") != "+" and not entry.get("Attributes", "").startswith("D"):
+                    found.append((entry["Path"], int(entry.get("Size") or 0)))
+                entry = {}
+        return found
+    return []
+
+def pick_member(path):
+    """(name, size) of the largest importable file in an archive."""
+    candidates = [m for m in members(path) if Path(m[0]).suffix.lower() in FORMATS]
+    if not candidates:
+        raise ValueError(f"No importable file in {Path(path).name}")
+    return max(candidates, key=lambda m: m[1])
+
+def inner_format(path):
+    """Extension of the data inside `path`: 'people.csv.gz' -> '.csv'; the picked member for archives."""
+    ext = compression(path)
+    if ext in ARCHIVES:
+        return Path(pick_member(path)[0]).suffix.lower()
+    if ext:
+        return Path(Path(path).stem).suffix.lower()
+    return Path(path).suffix.lower()
+
+def source_name(path):
+    """Default database name of a source: the file name without its compression and format extensions."""
+    path = Path(path)
+    name = path.stem
+    if compression(path) and Path(name).suffix.lower() in FORMATS:
+        name = Path(name).stem
+    return name
+
+def uncompressed_size(path):
+    """Size of the data once decompressed, when the format records it; None otherwise (bz2, large gzip)."""
+    ext = compression(path)
+    if ext in ARCHIVES:
+        return pick_member(path)[1]
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        if ext == '.gz' and 18 <= size < GZIP_TRUSTED_BYTES:
+            f.seek(-4, os.SEEK_END)
+            isize = int.from_bytes(f.read(4), "little")
+            return isize if isize <= size * DEFLATE_MAX_RATIO else None  # a truncated file ends with garbage
+        if ext == '.xz' and size >= 24:
+            return _xz_size(f, size)
+    return None
+
+def describe(path):
+    """{"compression", "format", "uncompressed_size"} of a compressed file; format is None when it can't be read."""
+    info = {"compression": compression(path), "format": None, "uncompressed_size": None}
+    try:
+        if info["compression"] in ARCHIVES:
+            name, info["uncompressed_size"] = pick_member(path)
+            info["format"] = Path(name).suffix.lower()
+        else:
+            info["format"] = inner_format(path) or None
+            info["uncompressed_size"] = uncompressed_size(path)
+    except (ValueError, OSError, IndexError, zipfile.BadZipFile, subprocess.CalledProcessError):
+        pass
+    return info
+
+def _varint(buf, pos):
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, pos
+
+def _xz_size(f, size):
+    """Uncompressed size summed from the index of a single-stream .xz file."""
+    f.seek(-12, os.SEEK_END)
+    footer = f.read(12)
+    if footer[10:] != b"YZ":
+        return None
+    index_size = (int.from_bytes(footer[4:8], "little") + 1) * 4
+    f.seek(-12 - index_size, os.SEEK_END)
+    index = f.read(index_size)
+    count, pos = _varint(index, 1)
+    total, blocks = 0, 0
+    for _ in range(count):
+        unpadded, pos = _varint(index, pos)
+        usize, pos = _varint(index, pos)
+        blocks += (unpadded + 3) // 4 * 4
+        total += usize
+    # several concatenated streams: the last index only covers the last one
+    return total if 12 + blocks + index_size + 12 == size else None
+
+class DecompressStream(io.BufferedIOBase):
+    """Read-only binary stream of the decompressed content of `path`."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = str(path)
+        self.compression = compression(path)
+        self.compressed_size = os.path.getsize(path)
+        self.member = self.member_size = None
+        if self.compression in ARCHIVES:
+            self.member, self.member_size = pick_member(path)
+        self.produced = 0
+        self._consumed = 0
+        self._chunks = queue.Queue(maxsize=STREAM_QUEUE)
+        self._buf, self._pos = b"", 0
+        self._eof = False
+        self._error = None
+        self._proc = self._raw = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name="decompress", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        """(decompressed file object, function returning the compressed bytes read so far)."""
+        if self.compression == '.7z':
+            self._proc = subprocess.Popen([SEVEN_ZIP, "x", "-so", self.path, self.member],
+                                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            # 7z does not report its input position: estimate it from the output
+            ratio = self.compressed_size / self.member_size if self.member_size else 0
+            return self._proc.stdout, lambda: min(int(self.produced * ratio), self.compressed_size)
+        raw = self._raw = open(self.path, 'rb')
+        if self.compression == '.zip':
+            reader = zipfile.ZipFile(raw).open(self.member)
+        elif self.compression == '.gz':
+            reader = gzip.GzipFile(fileobj=raw)
+        else:
+            reader = (bz2.BZ2File if self.compression == '.bz2' else lzma.LZMAFile)(raw)
+        return reader, raw.tell
+
+    def _produce(self):
+        try:
+            reader, position = self._open()
+            with reader:
+                while not self._stop.is_set():
+                    chunk = reader.read(STREAM_CHUNK)
+                    self.produced += len(chunk)
+                    self._consumed = position()
+                    if not chunk:
+                        break
+                    self._put(chunk)
+            if self._proc and self._proc.wait() != 0 and not self._stop.is_set():
+                raise OSError(f"7z exited with status {self._proc.returncode} reading {self.path}")
+        except Exception as e:
+            self._error = e
+        finally:
+            if self._raw:
+                self._raw.close()
+            self._put(None)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        """Compressed bytes consumed so far (decompression runs a few chunks ahead of the reader)."""
+        return self._consumed
+
+    def read1(self, size=-1):
+        if self._pos >= len(self._buf):
+            if self._eof:
+                return b""
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._eof = True
+                if self._error:
+                    raise self._error
+                return b""
+            self._buf, self._pos = chunk, 0
+        if size is None or size < 0:
+            size = len(self._buf) - self._pos
+        out = self._buf[self._pos:self._pos + size]
+        self._pos += len(out)
+        return out
+
+    def read(self, size=-1):
+        parts, n = [], 0
+        while size is None or size < 0 or n < size:
+            part = self.read1(-1 if size is None or size < 0 else size - n)
+            if not part:
+                break
+            parts.append(part)
+            n += len(part)
+        return b"".join(parts)
+
+    def close(self):
+        if self.closed:
+            return
+        self._stop.set()
+        if self._proc and self._proc.poll() is None:
+            self._proc.kill()
+        while self._thread.is_alive():
+            try:
+                self._chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        super().close()
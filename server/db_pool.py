@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+import queue
+from contextlib import contextmanager
+from pathlib import Path
+
+POOL_SIZE = 4
+POOL_TIMEOUT = 10
+MMAP_SIZE = 512 * 1024 * 1024
+CACHE_SIZE_KB = 65536
+CACHED_STATEMENTS = 256  # prepared statements kept per connection
+
+def open_readonly(db_path, mmap_size=MMAP_SIZE, cache_kb=CACHE_SIZE_KB, immutable=False):
+    """Read-only connection; `immutable` also skips locking and change detection (files attached in place)."""
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro" + ("&immutable=1" if immutable else "")
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+    conn.execute("PRAGMA query_only=ON")
+    conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+    conn.execute(f"PRAGMA cache_size=-{int(cache_kb)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+class ConnectionPool:
+    """Long-lived read-only connections to one database file.
+
+    Connections are opened lazily up to `size` and handed out LIFO so the
+    most recently used one (warmest page cache) is reused first.
+    """
+
+    def __init__(self, db_path, size=POOL_SIZE, timeout=POOL_TIMEOUT, mmap_size=MMAP_SIZE, cache_kb=CACHE_SIZE_KB,
+                 immutable=False):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.cache_kb = cache_kb
+        self.immutable = immutable
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return open_readonly(self.db_path, self.mmap_size, self.cache_kb, self.immutable)
+                except Exception:
+                    self._opened -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free connection for {self.db_path} after {self.timeout}s")
+
+    def _release(self, conn):
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+    def stats(self):
+        return {"size": self.size, "opened": self._opened, "idle": self._idle.qsize()}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name, db_path, version=None, **kwargs):
+    """Return the pool for `name`, replacing it if the file or version changed."""
+    with _pools_lock:
+        entry = _pools.get(name)
+        if entry and entry[1] == (db_path, version):
+            return entry[0]
+        if entry:
+            entry[0].close()
+        pool = ConnectionPool(db_path, **kwargs)
+        _pools[name] = (pool, (db_path, version))
+        return pool
+
+def reset_pool(name):
+    with _pools_lock:
+        entry = _pools.pop(name, None)
+    if entry:
+        entry[0].close()
+
+def pool_stats():
+    with _pools_lock:
+        return {name: entry[0].stats() for name, entry in _pools.items()}
@@ -1,82 +1,28 @@
-"""Quick import script - runs directly, no API timeout"""
-import sqlite3, csv, json, re, os, time
-from pathlib import Path
+"""Quick import script - runs directly, no API timeout
 
-DB_DIR = Path("data")
-DB_DIR.mkdir(exist_ok=True)
-INDEX_DB = DB_DIR / "datachat_index.db"
-CHUNK = 100000
+Usage: python import_db.py <file> <name> [--columns nom,email,...] [--workers N] [--no-fts]
+       python import_db.py <file> <name> --delta [--key email] [--delete-missing]
+       python import_db.py <file.db> <name> --attach [--exact-counts]
+"""
+import argparse
+import os
+from importer import import_file
 
-def import_csv(filepath, name, columns):
-    print(f"[*] Importing {filepath} as '{name}'...")
-    db_path = str(DB_DIR / f"{name}.db")
-    conn = sqlite3.connect(db_path)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA synchronous=OFF")
-    conn.execute("PRAGMA cache_size=-200000")
-    
-    col_defs = ", ".join([f'"{c}" TEXT' for c in columns])
-    conn.execute(f'DROP TABLE IF EXISTS "{name}"')
-    conn.execute(f'CREATE TABLE "{name}" ({col_defs})')
-    
-    placeholders = ", ".join(["?" for _ in columns])
-    row_count = 0
-    batch = []
-    start = time.time()
-    
-    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) < len(columns): row.extend([''] * (len(columns) - len(row)))
-            elif len(row) > len(columns): row = row[:len(columns)]
-            batch.append(row)
-            row_count += 1
-            if len(batch) >= CHUNK:
-                conn.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', batch)
-                conn.commit()
-                batch = []
-                elapsed = time.time() - start
-                rate = row_count / elapsed
-                print(f"  [{row_count:,} rows] {elapsed:.1f}s ({rate:,.0f} rows/s)")
-    
-    if batch:
-        conn.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', batch)
-        conn.commit()
-    
-    # Create indexes
-    print(f"[*] Creating indexes...")
-    for col in columns:
-        if any(kw in col for kw in ['nom', 'email', 'telephone', 'code_postal', 'ville']):
-            conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{name}_{col}" ON "{name}" ("{col}")')
-            print(f"  Index on {col}")
-    conn.commit()
-    conn.close()
-    
-    # Register in index DB
-    conn = sqlite3.connect(str(INDEX_DB))
-    conn.execute("""CREATE TABLE IF NOT EXISTS databases (
-        name TEXT PRIMARY KEY, source_path TEXT, db_path TEXT,
-        tables TEXT, row_count INTEGER, status TEXT, imported_at TEXT
-    )""")
-    conn.execute("""CREATE TABLE IF NOT EXISTS conversations (
-        id TEXT PRIMARY KEY, title TEXT, created_at TEXT, updated_at TEXT
-    )""")
-    conn.execute("""CREATE TABLE IF NOT EXISTS messages (
-        id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id TEXT,
-        role TEXT, content TEXT, sql_query TEXT, results_count INTEGER,
-        created_at TEXT
-    )""")
-    conn.execute("INSERT OR REPLACE INTO databases VALUES (?,?,?,?,?,?,?)",
-        (name, filepath, db_path, json.dumps(columns), row_count, 'ready', time.strftime('%Y-%m-%dT%H:%M:%S')))
-    conn.commit()
-    conn.close()
-    
-    elapsed = time.time() - start
-    print(f"\n[✓] Done! {row_count:,} rows imported in {elapsed:.1f}s")
-    print(f"    DB: {db_path} ({os.path.getsize(db_path)/1024/1024:.1f} MB)")
-
-import_csv(
-    "your_file.csv",
-    "your_table",
-    ["nom", "email", "telephone", "adresse", "complement", "code_postal", "ville", "pays"]
-)
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("file")
+    ap.add_argument("name")
+    ap.add_argument("--columns", help="comma-separated column names (default: header row or col_1..N)")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) - 1),
+                    help="parser processes for CSV/TXT/JSONL (1 = single-threaded)")
+    ap.add_argument("--no-fts", action="store_true", help="skip the trigram full-text index")
+    ap.add_argument("--delta", action="store_true", help="only add rows missing from the existing table")
+    ap.add_argument("--key", help="column identifying a row for --delta (default: the whole row)")
+    ap.add_argument("--delete-missing", action="store_true", help="with --delta, remove rows no longer in the file")
+    ap.add_argument("--attach", action="store_true", help="register a SQLite file in place instead of copying it")
+    ap.add_argument("--exact-counts", action="store_true", help="with --attach, COUNT(*) every table instead of estimating")
+    args = ap.parse_args()
+    columns = args.columns.split(",") if args.columns else None
+    import_file(args.file, args.name, columns, fts=not args.no_fts, parse_workers=args.workers, log=print,
+                delta=args.delta, key=args.key, delete_missing=args.delete_missing,
+                attach=args.attach, exact_counts=args.exact_counts)
@@ -0,0 +1,830 @@
+"""Streaming import engine shared by the API and the import scripts.
+
+Every supported source (CSV, JSON array, JSONL, delimited TXT, SQLite) is
+read as a stream of rows and written in bounded batches, so memory stays flat
+whatever the file size. Secondary indexes, the FTS side index and the count
+summaries are built once the load is finished.
+
+Line-oriented sources (CSV/TXT without quoted newlines, JSONL) can also be
+split into byte ranges parsed by a process pool, with a single writer
+draining a bounded queue of parsed chunks inside one transaction. If a range
+turns out to start inside a quoted field, the load is rolled back and redone
+in a single process.
+
+A delta import (`delta=True`) instead keeps the existing table and inserts
+only rows it does not have yet, identified by a key column or a content
+hash, with indexes, FTS and summaries updated in place.
+
+An existing SQLite file can instead be attached in place (`attach=True`):
+nothing is copied, its tables are only introspected into the registry and
+queried straight from the file.
+
+Compressed sources (.gz, .bz2, .xz, .zip, .7z) are read as streams through
+compressed.DecompressStream, decompressing on another thread while this one
+parses; progress is counted in compressed bytes.
+"""
+import sqlite3
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import time
+import uuid
+import threading
+import unicodedata
+import queue
+import multiprocessing
+from itertools import chain, islice
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from registry import register_database, read_databases
+from search_index import build_fts, sync_fts
+from aggregates import build_aggregates, adjust_aggregates
+from normalize import shadow_plan, add_shadow
+from scanner import fingerprint, HASH_BYTES
+from db_pool import open_readonly
+from compressed import DecompressStream, FORMATS, compression, inner_format
+
+DB_DIR = Path("data")
+INDEX_DB = DB_DIR / "datachat_index.db"
+BATCH_ROWS = 50000
+SAMPLE_LINES = 200
+JSON_CHUNK = 1024 * 1024
+JSON_MAX_OBJECT = 64 * 1024 * 1024  # characters buffered for one array element before it counts as malformed
+PARSE_CHUNK_BYTES = 16 * 1024 * 1024
+INDEX_KEYWORDS = ['nom', 'email', 'telephone', 'code_postal', 'ville']
+IMPORTABLE = FORMATS
+TXT_DELIMITERS = [':', ';', '|', '\t', ',']
+LOOKUP_CHUNK = 500  # keys per IN (...) lookup during a delta import
+ANALYSIS_LIMIT = 1000  # rows sampled per index by ANALYZE (0 = all)
+
+def clean_columns(names):
+    """Lowercase, accent-free, SQL-safe, unique column names."""
+    out = []
+    for i, n in enumerate(names):
+        c = unicodedata.normalize('NFKD', str(n or '')).encode('ascii', 'ignore').decode()
+        c = re.sub(r'\W+', '_', c.strip().lower()).strip('_') or f"col_{i + 1}"
+        base, k = c, 2
+        while c in out:
+            c = f"{base}_{k}"
+            k += 1
+        out.append(c)
+    return out
+
+def fit(row, width):
+    if len(row) < width: return list(row) + [''] * (width - len(row))
+    if len(row) > width: return row[:width]
+    return row
+
+def prepare(row, width, plan):
+    """Fit a parsed row to the table width and append its normalized shadow values."""
+    row = fit(row, width)
+    return add_shadow(row, plan) if plan else row
+
+def cell(v):
+    if v is None:
+        return None
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, ensure_ascii=False)
+    return str(v)
+
+class Source:
+    """A readable input: `columns`, a `rows()` iterator and byte progress.
+
+    For a compressed file, `total_bytes` and `bytes_read()` count compressed bytes.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.compression = compression(path)
+        self.total_bytes = os.path.getsize(path)
+        self.columns = []
+        self._raw = None
+
+    def bytes_read(self):
+        try:
+            return self._raw.tell() if self._raw else 0
+        except (ValueError, OSError):
+            return self.total_bytes
+
+    def open_text(self):
+        self._raw = DecompressStream(self.path) if self.compression else open(self.path, 'rb')
+        return io.TextIOWrapper(self._raw, encoding='utf-8-sig', errors='replace', newline='')
+
+    def parallel_spec(self):
+        """How worker processes can parse byte ranges of this source, or None."""
+        return None
+
+    def close(self):
+        if self._raw:
+            self._raw.close()
+
+class DelimitedSource(Source):
+    def __init__(self, path, columns=None, delimiter=None):
+        super().__init__(path)
+        self.text = self.open_text()
+        sample = list(islice(self.text, SAMPLE_LINES))
+        joined = "".join(sample)
+        if delimiter is None:
+            delimiter = self.sniff_delimiter(joined)
+        self.delimiter = delimiter
+        parsed = list(csv.reader(sample, delimiter=delimiter))
+        width = max((len(r) for r in parsed), default=0)
+        has_header = False
+        if columns is None and parsed:
+            try:
+                has_header = csv.Sniffer().has_header(joined)
+            except csv.Error:
+                has_header = False
+        # a record spanning several lines means quoted newlines: ranges can't be split on \n;
+        # a compressed stream can't be split at all
+        self._splittable = len(parsed) == len(sample) and not self.compression
+        self._data_offset = 0
+        if columns:
+            self.columns = clean_columns(columns)
+        elif has_header:
+            self.columns = clean_columns(parsed[0])
+            sample = sample[1:]
+            if self._splittable:
+                with open(self.path, 'rb') as f:
+                    f.readline()
+                    self._data_offset = f.tell()
+        else:
+            self.columns = [f"col_{i + 1}" for i in range(width)]
+        self._lines = chain(sample, self.text)
+
+    def parallel_spec(self):
+        if not self._splittable:
+            return None
+        return {"path": self.path, "kind": "delimited", "delimiter": self.delimiter,
+                "offset": self._data_offset, "width": len(self.columns)}
+
+    def sniff_delimiter(self, sample):
+        try:
+            return csv.Sniffer().sniff(sample, delimiters=",;\t|:").delimiter
+        except csv.Error:
+            return ','
+
+    def rows(self):
+        for row in csv.reader(self._lines, delimiter=self.delimiter):
+            if row:
+                yield row
+
+class TextSource(DelimitedSource):
+    """Line-oriented dumps (`email:password`, `a|b|c`...) with a guessed separator."""
+
+    def sniff_delimiter(self, sample):
+        lines = [l for l in sample.splitlines() if l.strip()]
+        best, best_score = TXT_DELIMITERS[0], -1
+        for d in TXT_DELIMITERS:
+            counts = [l.count(d) for l in lines]
+            if not counts or min(counts) == 0:
+                continue
+            score = sum(1 for c in counts if c == counts[0])
+            if score > best_score:
+                best, best_score = d, score
+        return best
+
+class JsonSource(Source):
+    """JSON array of objects, or one object per line (JSONL/NDJSON)."""
+
+    def __init__(self, path, columns=None, sample_objects=1000):
+        super().__init__(path)
+        self.text = self.open_text()
+        head, skipped = self.text.read(1), 1
+        while head and head.isspace():
+            head, skipped = self.text.read(1), skipped + 1
+        self._objects = self._iter_array(skipped) if head == '[' else self._iter_lines(head)
+        sample = list(islice(self._objects, sample_objects))
+        if columns:
+            self._keys = list(columns)
+        else:
+            keys = {}
+            for obj in sample:
+                if isinstance(obj, dict):
+                    keys.update(dict.fromkeys(obj))
+            self._keys = list(keys) or ["value"]
+        self.columns = clean_columns(self._keys)
+        self._objects = chain(sample, self._objects)
+        self._lines_mode = head != '['
+
+    def parallel_spec(self):
+        if not self._lines_mode or self.compression:
+            return None
+        return {"path": self.path, "kind": "jsonl", "keys": self._keys, "offset": 0, "width": len(self.columns)}
+
+    def _iter_lines(self, head):
+        for line in chain([head + self.text.readline()], self.text):
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+    def _iter_array(self, offset):
+        """Elements of a JSON array, read JSON_CHUNK at a time; `offset` is the byte position after '['.
+
+        Raises ValueError with the byte offset of an element that still fails
+        to decode at the end of the file or past JSON_MAX_OBJECT characters.
+        """
+        decoder = json.JSONDecoder()
+        buf, pos, eof = "", 0, False
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                error = None
+            except ValueError as e:
+                error = e
+            if error is None and (end < len(buf) or eof):
+                yield obj
+                pos = end
+                continue
+            # undecodable, or a value that ends with the buffer (a number may go on in the next chunk)
+            if error and (eof or len(buf) - pos > JSON_MAX_OBJECT):
+                if pos >= len(buf):
+                    return
+                raise ValueError(f"Malformed JSON element at byte {offset + len(buf[:pos].encode())} of {self.path}: {error.msg}") from error
+            chunk = self.text.read(JSON_CHUNK)
+            eof = not chunk
+            offset += len(buf[:pos].encode())
+            buf, pos = buf[pos:] + chunk, 0
+
+    def rows(self):
+        for obj in self._objects:
+            yield json_row(obj, self._keys)
+
+class SqliteSource(Source):
+    """Rows of one table (the largest by default) of an existing SQLite file."""
+
+    def __init__(self, path, columns=None, table=None):
+        super().__init__(path)
+        self.conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+        tables = [r[0] for r in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+        if not tables:
+            raise ValueError(f"No tables in {path}")
+        counts = {t: self.conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+        self.table = table or max(counts, key=counts.get)
+        self.total_rows = counts[self.table]
+        self._source_cols = [r[1] for r in self.conn.execute(f'PRAGMA table_info("{self.table}")')]
+        self.columns = clean_columns(columns or self._source_cols)
+        self._done = 0
+
+    def bytes_read(self):
+        if not self.total_rows:
+            return self.total_bytes
+        return int(self.total_bytes * self._done / self.total_rows)
+
+    def rows(self):
+        cols = ", ".join([f'"{c}"' for c in self._source_cols])
+        cursor = self.conn.execute(f'SELECT {cols} FROM "{self.table}"')
+        while True:
+            batch = cursor.fetchmany(BATCH_ROWS)
+            if not batch:
+                return
+            for row in batch:
+                yield [cell(v) for v in row]
+            self._done += len(batch)
+
+    def close(self):
+        self.conn.close()
+
+def json_row(obj, keys):
+    if isinstance(obj, dict):
+        return [cell(obj.get(k)) for k in keys]
+    return [cell(obj)]
+
+def byte_ranges(path, offset, size, chunk):
+    """Split [offset, size) into ~chunk-sized ranges ending on line boundaries."""
+    with open(path, 'rb') as f:
+        start = offset
+        while start < size:
+            end = min(start + chunk, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            yield start, end
+            start = end
+
+class SplitError(ValueError):
+    """A byte range of a delimited source started inside a quoted field."""
+
+def parse_range(spec, start, end):
+    """Worker entry point: parse one byte range into fitted rows.
+
+    Also returns the number of double quotes in the range, so the writer can
+    check that every range starts outside a quoted field.
+    """
+    t = time.perf_counter()
+    with open(spec["path"], 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if start == 0 and data.startswith(b'\xef\xbb\xbf'):
+        data = data[3:]
+    text = data.decode('utf-8', errors='replace')
+    width, plan = spec["width"], spec.get("shadow")
+    if spec["kind"] == "jsonl":
+        rows = [prepare(json_row(json.loads(l), spec["keys"]), width, plan) for l in text.splitlines() if l.strip()]
+        quotes = 0
+    else:
+        rows = [prepare(r, width, plan) for r in csv.reader(io.StringIO(text, newline=''), delimiter=spec["delimiter"]) if r]
+        quotes = data.count(b'"')
+    return rows, end - start, time.perf_counter() - t, quotes
+
+def open_source(path, columns=None, **kwargs):
+    ext = inner_format(path)
+    if ext == '.csv':
+        return DelimitedSource(path, columns, **kwargs)
+    if ext in ('.json', '.jsonl', '.ndjson'):
+        return JsonSource(path, columns, **kwargs)
+    if ext == '.txt':
+        return TextSource(path, columns, **kwargs)
+    if ext in ('.db', '.sqlite', '.sqlite3'):
+        if compression(path):
+            raise ValueError(f"SQLite files can't be read compressed; extract {Path(path).name} first")
+        return SqliteSource(path, columns, **kwargs)
+    raise ValueError(f"Unsupported file type: {ext}")
+
+class ImportJob:
+    def __init__(self, path, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.path = str(path)
+        self.name = name
+        self.status = "queued"
+        self.stage = None
+        self.rows = 0
+        self.bytes_read = 0
+        self.total_bytes = 0
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.workers = 1
+        self.parse_rows = 0
+        self.parse_seconds = 0.0
+        self.write_seconds = 0.0
+        self.writer_wait = 0.0
+        self.mode = "full"
+        self.compression = None
+        self.skipped = 0
+        self.deleted = 0
+
+    def stage_stats(self):
+        """Per-stage throughput: parse is per worker, write is the single writer."""
+        def rate(rows, seconds):
+            return round(rows / seconds) if seconds else 0
+        return {
+            "workers": self.workers,
+            "parse": {"rows": self.parse_rows, "seconds": round(self.parse_seconds, 2),
+                      "rows_per_s": rate(self.parse_rows, self.parse_seconds),
+                      "rows_per_s_all_workers": rate(self.parse_rows, self.parse_seconds) * self.workers},
+            "write": {"rows": self.rows, "seconds": round(self.write_seconds, 2),
+                      "rows_per_s": rate(self.rows, self.write_seconds)},
+            "writer_wait_seconds": round(self.writer_wait, 2)
+        }
+
+    def to_dict(self):
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0
+        rate = self.rows / elapsed if elapsed else 0
+        byte_rate = self.bytes_read / elapsed if elapsed else 0
+        eta = None
+        if self.status == "running" and self.stage == "loading" and byte_rate:
+            eta = round(max(self.total_bytes - self.bytes_read, 0) / byte_rate, 1)
+        return {
+            "id": self.id, "name": self.name, "path": self.path, "status": self.status,
+            "stage": self.stage, "rows": self.rows, "bytes_read": self.bytes_read,
+            "total_bytes": self.total_bytes, "elapsed": round(elapsed, 1),
+            "rows_per_s": round(rate), "eta": eta, "error": self.error,
+            "success": self.status == "done", "row_count": self.rows,
+            "mode": self.mode, "compression": self.compression, "skipped": self.skipped, "deleted": self.deleted,
+            "stages": self.stage_stats()
+        }
+
+def _load_sequential(conn, insert, source, width, plan, job, log):
+    batch = []
+    mark = time.perf_counter()
+    for row in source.rows():
+        batch.append(prepare(row, width, plan))
+        if len(batch) >= BATCH_ROWS:
+            t = time.perf_counter()
+            job.parse_seconds += t - mark
+            job.parse_rows += len(batch)
+            conn.executemany(insert, batch)
+            conn.commit()
+            mark = time.perf_counter()
+            job.write_seconds += mark - t
+            job.rows += len(batch)
+            job.bytes_read = source.bytes_read()
+            batch = []
+            d = job.to_dict()
+            log(f"  [{job.rows:,} rows] {d['elapsed']}s ({d['rows_per_s']:,} rows/s)")
+    t = time.perf_counter()
+    job.parse_seconds += t - mark
+    job.parse_rows += len(batch)
+    if batch:
+        conn.executemany(insert, batch)
+        job.rows += len(batch)
+    conn.commit()
+    job.write_seconds += time.perf_counter() - t
+
+def _load_parallel(conn, insert, source, spec, job, log, workers):
+    """Insert the ranges parsed by `workers` processes; raises SplitError (nothing committed) on a bad split.
+
+    Escaped quotes come in pairs, so a range starts outside a quoted field
+    exactly when the quotes before it add up to an even number.
+    """
+    parsed = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+    failed = []  # the producer's exception, re-raised here so the partial load is not committed
+
+    def produce():
+        ctx = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                for start, end in byte_ranges(spec["path"], spec["offset"], source.total_bytes, PARSE_CHUNK_BYTES):
+                    if stop.is_set():
+                        break
+                    parsed.put(pool.submit(parse_range, spec, start, end))
+        except BaseException as e:
+            failed.append(e)
+        finally:
+            parsed.put(None)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    offset, quotes = spec["offset"], 0
+    try:
+        while True:
+            t = time.perf_counter()
+            future = parsed.get()
+            if future is None:
+                if failed:
+                    raise failed[0]
+                break
+            rows, nbytes, parse_seconds, range_quotes = future.result()
+            if quotes % 2:
+                raise SplitError(f"Quoted field spans the range boundary at byte {offset:,}")
+            offset += nbytes
+            quotes += range_quotes
+            t2 = time.perf_counter()
+            job.writer_wait += t2 - t
+            conn.executemany(insert, rows)
+            job.write_seconds += time.perf_counter() - t2
+            job.parse_seconds += parse_seconds
+            job.parse_rows += len(rows)
+            job.rows += len(rows)
+            job.bytes_read += nbytes
+            d = job.to_dict()
+            log(f"  [{job.rows:,} rows] {d['elapsed']}s ({d['rows_per_s']:,} rows/s)")
+        t = time.perf_counter()
+        conn.commit()
+        job.write_seconds += time.perf_counter() - t
+    finally:
+        stop.set()
+        while producer.is_alive():
+            try:
+                parsed.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+def analyze(conn, limit=ANALYSIS_LIMIT):
+    """Refresh sqlite_stat1 so the planner can choose between indexes."""
+    conn.execute(f"PRAGMA analysis_limit={int(limit)}")
+    conn.execute("ANALYZE")
+    conn.commit()
+
+def row_hash_table(table):
+    return f"{table}__rows"
+
+def row_hash(row, width):
+    return hashlib.blake2b(json.dumps(row[:width], ensure_ascii=False).encode(), digest_size=16).digest()
+
+def _existing(conn, sql, keys):
+    """Subset of `keys` found by `sql` (a SELECT with an `IN ({})` placeholder)."""
+    found = set()
+    keys = list(keys)
+    for i in range(0, len(keys), LOOKUP_CHUNK):
+        chunk = keys[i:i + LOOKUP_CHUNK]
+        found.update(r[0] for r in conn.execute(sql.format(", ".join("?" * len(chunk))), chunk))
+    return found
+
+def delta_import(path, name, columns=None, key=None, delete_missing=False, index_db=INDEX_DB,
+                 job=None, log=None, hash_bytes=HASH_BYTES, **source_kwargs):
+    """Bring an imported table up to date with `path` without reloading it.
+
+    Rows are identified by the `key` column, or by a hash of their content
+    kept in a `<name>__rows` side table (built on the first delta). Only
+    unseen rows are inserted; with `delete_missing`, rows absent from the
+    source are removed. Indexes stay live, and the FTS index and count
+    summaries are adjusted for just the changed rows. Returns the new row count.
+    """
+    job = job or ImportJob(path, name)
+    job.mode = "delta"
+    log = log or (lambda msg: None)
+    info = read_databases(index_db).get(name)
+    if not info:
+        raise ValueError(f"'{name}' has not been imported yet; run a full import first")
+    if info["immutable"]:
+        raise ValueError(f"'{name}' is attached in place and read-only; attach it again instead")
+    job.status, job.started, job.stage = "running", time.time(), "loading"
+
+    source_fp = fingerprint(path, hash_bytes)
+    source = open_source(path, columns, **source_kwargs)
+    columns = source.columns
+    if columns != info["columns"]:
+        source.close()
+        raise ValueError(f"Columns of {path} differ from '{name}'; run a full import instead")
+    if key and key not in columns:
+        source.close()
+        raise ValueError(f"Unknown key column '{key}'")
+    job.total_bytes, job.compression = source.total_bytes, source.compression
+    meta = dict(info["meta"])
+    shadow = meta.get("shadow") or {}
+    # only the shadow columns the table was built with (none before they existed)
+    plan = [p for p in shadow_plan(columns) if shadow.get(columns[p[0]]) == p[2]]
+    if len(plan) != len(shadow):
+        source.close()
+        raise ValueError(f"Normalized columns of '{name}' are out of date; run a full import instead")
+    width = len(columns)
+    log(f"[*] Delta import of {path} into '{name}' (by {key or 'row content'})...")
+
+    conn = sqlite3.connect(info["db_path"])
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA cache_size=-200000")
+        hashes = row_hash_table(name)
+        if key:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{name}_{key}" ON "{name}" ("{key}")')
+            lookup = f'SELECT "{key}" FROM "{name}" WHERE "{key}" IN ({{}})'
+            key_index = columns.index(key)
+            identify = lambda row: row[key_index]
+        else:
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (hashes,)).fetchone():
+                job.stage = "hashing"
+                log("  Hashing existing rows (first delta only)...")
+                conn.execute(f'CREATE TABLE "{hashes}" (hash BLOB PRIMARY KEY, rid INTEGER) WITHOUT ROWID')
+                col_list = ", ".join([f'"{c}"' for c in columns])
+                cur = conn.execute(f'SELECT rowid, {col_list} FROM "{name}"')
+                while True:
+                    batch = cur.fetchmany(BATCH_ROWS)
+                    if not batch:
+                        break
+                    conn.executemany(f'INSERT OR IGNORE INTO "{hashes}" VALUES (?, ?)',
+                                     [(row_hash(list(r[1:]), width), r[0]) for r in batch])
+                job.stage = "loading"
+            lookup = f'SELECT hash FROM "{hashes}" WHERE hash IN ({{}})'
+            identify = lambda row: row_hash(row, width)
+        if delete_missing:
+            conn.execute("CREATE TEMP TABLE seen (k PRIMARY KEY) WITHOUT ROWID")
+
+        first_new = next_rid = (conn.execute(f'SELECT MAX(rowid) FROM "{name}"').fetchone()[0] or 0) + 1
+        all_cols = ", ".join([f'"{c}"' for c in columns + [col for _, _, col in plan]])
+        insert = f'INSERT INTO "{name}" (rowid, {all_cols}) VALUES ({", ".join(["?"] * (1 + width + len(plan)))})'
+        rows = iter(source.rows())
+        while True:
+            batch = [prepare(r, width, plan) for r in islice(rows, BATCH_ROWS)]
+            if not batch:
+                break
+            ids = [identify(r) for r in batch]
+            if delete_missing:
+                conn.executemany("INSERT OR IGNORE INTO temp.seen VALUES (?)", [(k,) for k in ids if k is not None])
+            known = _existing(conn, lookup, set(ids))
+            new, new_hashes = [], []
+            for r, k in zip(batch, ids):
+                if k in known:
+                    job.skipped += 1
+                    continue
+                known.add(k)
+                new.append([next_rid] + r)
+                if not key:
+                    new_hashes.append((k, next_rid))
+                next_rid += 1
+            conn.executemany(insert, new)
+            if new_hashes:
+                conn.executemany(f'INSERT INTO "{hashes}" VALUES (?, ?)', new_hashes)
+            job.rows += len(new)
+            job.parse_rows += len(batch)
+            job.bytes_read = source.bytes_read()
+            log(f"  [{job.parse_rows:,} rows read] {job.rows:,} new, {job.skipped:,} unchanged")
+
+        job.stage = "indexing"
+        if delete_missing:
+            if key:
+                conn.execute(f'CREATE TEMP TABLE gone AS SELECT rowid AS rid FROM "{name}" WHERE "{key}" NOT IN (SELECT k FROM temp.seen)')
+            else:
+                conn.execute(f'CREATE TEMP TABLE gone AS SELECT rid FROM "{hashes}" WHERE hash NOT IN (SELECT k FROM temp.seen)')
+            gone = "rowid IN (SELECT rid FROM temp.gone)"
+            if meta.get("fts"):
+                sync_fts(conn, meta["fts"], name, gone, delete=True)
+            adjust_aggregates(conn, name, meta.get("aggregates"), gone, shadow=shadow, sign=-1)
+            job.deleted = conn.execute(f'DELETE FROM "{name}" WHERE {gone}').rowcount
+            if not key:
+                conn.execute(f'DELETE FROM "{hashes}" WHERE rid IN (SELECT rid FROM temp.gone)')
+            log(f"  Removed {job.deleted:,} rows missing from the source")
+        if meta.get("fts"):
+            sync_fts(conn, meta["fts"], name, "rowid >= ?", [first_new])
+        adjust_aggregates(conn, name, meta.get("aggregates"), "rowid >= ?", [first_new], shadow=shadow)
+        conn.commit()
+    finally:
+        source.close()
+        conn.close()
+
+    row_count = (info["row_count"] or 0) + job.rows - job.deleted
+    meta["source"] = source_fp
+    register_database(index_db, name, str(path), info["db_path"], columns, row_count, meta)
+    job.status, job.stage, job.finished = "done", None, time.time()
+    log(f"[✓] Done! {job.rows:,} new, {job.deleted:,} removed, {job.skipped:,} unchanged in {job.finished - job.started:.1f}s")
+    return row_count
+
+def import_file(path, name, columns=None, db_dir=DB_DIR, index_db=INDEX_DB, fts=True,
+                parse_workers=1, job=None, log=None, delta=False, key=None, delete_missing=False,
+                attach=False, exact_counts=False, hash_bytes=HASH_BYTES, **source_kwargs):
+    """Import `path` into `<db_dir>/<name>.db` and register it. Returns the row count.
+
+    With `parse_workers` > 1 and a splittable source, parsing runs in that many
+    processes while this thread writes. With `delta`, hands over to
+    delta_import (`key`, `delete_missing`) instead of rebuilding the table;
+    with `attach`, to attach_database (`exact_counts`). The source fingerprint
+    hashes `hash_bytes` at each end, like the scanner it is compared with.
+    """
+    if attach:
+        return attach_database(path, name, index_db=index_db, job=job, log=log, exact_counts=exact_counts,
+                               hash_bytes=hash_bytes)
+    if delta:
+        return delta_import(path, name, columns, key=key, delete_missing=delete_missing,
+                            index_db=index_db, job=job, log=log, hash_bytes=hash_bytes, **source_kwargs)
+    job = job or ImportJob(path, name)
+    log = log or (lambda msg: None)
+    db_dir = Path(db_dir)
+    db_dir.mkdir(exist_ok=True)
+    db_path = str(db_dir / f"{name}.db")
+    job.status, job.started, job.stage = "running", time.time(), "loading"
+
+    source_fp = fingerprint(path, hash_bytes)  # taken before reading, so edits made during the import count as changes
+    source = open_source(path, columns, **source_kwargs)
+    columns = source.columns
+    job.total_bytes, job.compression = source.total_bytes, source.compression
+    log(f"[*] Importing {path} as '{name}' ({len(columns)} columns)...")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-200000")
+        plan = shadow_plan(columns)
+        shadow = {columns[i]: col for i, _, col in plan}
+        col_defs = ", ".join([f'"{c}" TEXT' for c in columns + list(shadow.values())])
+        conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+        conn.execute(f'DROP TABLE IF EXISTS "{row_hash_table(name)}"')
+        conn.execute(f'CREATE TABLE "{name}" ({col_defs})')
+        insert = f'INSERT INTO "{name}" VALUES ({", ".join(["?" for _ in range(len(columns) + len(plan))])})'
+        width = len(columns)
+
+        spec = source.parallel_spec() if parse_workers > 1 else None
+        if spec:
+            spec["shadow"] = plan
+        if spec and source.total_bytes > 2 * PARSE_CHUNK_BYTES:
+            job.workers = parse_workers
+            log(f"  Parsing with {parse_workers} worker processes")
+            try:
+                _load_parallel(conn, insert, source, spec, job, log, parse_workers)
+            except SplitError as e:
+                conn.rollback()
+                log(f"  {e}; parsing again in a single process")
+                job.workers, job.rows, job.bytes_read = 1, 0, 0
+                job.parse_rows, job.parse_seconds, job.write_seconds, job.writer_wait = 0, 0.0, 0.0, 0.0
+                _load_sequential(conn, insert, source, width, plan, job, log)
+        else:
+            _load_sequential(conn, insert, source, width, plan, job, log)
+        job.bytes_read = source.total_bytes
+        s = job.stage_stats()
+        log(f"  Parse: {s['parse']['rows_per_s_all_workers']:,} rows/s, write: {s['write']['rows_per_s']:,} rows/s, "
+            f"writer waited {s['writer_wait_seconds']}s")
+
+        job.stage = "indexing"
+        log("[*] Creating indexes...")
+        name_cols = {columns[i] for i, kind, _ in plan if kind == "name"}
+        for col in columns:
+            if col in name_cols:
+                continue  # names are searched with FTS or LIKE '%word%', which no B-tree index serves
+            if col in shadow:
+                col = shadow[col]
+            elif not any(kw in col for kw in INDEX_KEYWORDS):
+                continue
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{name}_{col}" ON "{name}" ("{col}")')
+            log(f"  Index on {col}")
+        conn.commit()
+        fts_meta = None
+        if fts:
+            job.stage = "fts"
+            log("[*] Building full-text index...")
+            fts_meta = build_fts(conn, name, columns)
+        job.stage = "summaries"
+        log("[*] Building count summaries...")
+        aggregates = build_aggregates(conn, name, columns, shadow)
+        job.stage = "analyze"
+        log("[*] Gathering planner statistics...")
+        analyze(conn)
+    finally:
+        source.close()
+        conn.close()
+
+    register_database(index_db, name, str(path), db_path, columns, job.rows,
+                      {"fts": fts_meta, "aggregates": aggregates, "shadow": shadow, "source": source_fp})
+    job.status, job.stage, job.finished = "done", None, time.time()
+    log(f"[✓] Done! {job.rows:,} rows imported in {job.finished - job.started:.1f}s")
+    return job.rows
+
+def table_rows(conn, table, without_rowid=False, exact=False):
+    """(row count, estimated): MAX(rowid) unless `exact` or the table has no rowid, as COUNT(*) reads it all."""
+    if exact or without_rowid:
+        return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0], False
+    return conn.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM "{table}"').fetchone()[0], True
+
+def attach_database(path, name, index_db=INDEX_DB, job=None, log=None, exact_counts=False, hash_bytes=HASH_BYTES):
+    """Register an existing SQLite file in place, without copying it. Returns the row count.
+
+    Every table is recorded in meta["tables"] with its columns, row count and
+    whether it has a rowid; chat queries go to the largest one (meta["table"]),
+    any table can be read through /api/query. The file is opened with
+    `immutable=1`, so it must not change while attached (the scanner marks it
+    stale when it does), and it gets no FTS index, summaries or shadow columns.
+    Row counts are MAX(rowid) estimates unless `exact_counts`.
+    """
+    job = job or ImportJob(path, name)
+    job.mode = "attach"
+    log = log or (lambda msg: None)
+    path = Path(path).resolve()
+    if compression(path):
+        raise ValueError(f"SQLite files can't be attached compressed; extract {path.name} first")
+    wal = Path(f"{path}-wal")
+    if wal.exists() and wal.stat().st_size:
+        raise ValueError(f"{path.name} has uncommitted WAL data; checkpoint it before attaching")
+    job.status, job.started, job.stage = "running", time.time(), "introspecting"
+    job.total_bytes = os.path.getsize(path)
+    source_fp = fingerprint(path, hash_bytes)
+    log(f"[*] Attaching {path} as '{name}' in place...")
+
+    conn = open_readonly(path, mmap_size=0, immutable=True)
+    try:
+        tables = {}
+        for schema, table, kind, _, without_rowid, _ in conn.execute("PRAGMA table_list"):
+            if schema != "main" or kind != "table" or table.startswith("sqlite_"):
+                continue
+            rows, estimated = table_rows(conn, table, without_rowid, exact_counts)
+            tables[table] = {"columns": [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')],
+                             "rows": rows, "estimated": estimated, "rowid": not without_rowid}
+            log(f"  {table}: {len(tables[table]['columns'])} columns, {'~' if estimated else ''}{rows:,} rows")
+    finally:
+        conn.close()
+    if not tables:
+        raise ValueError(f"No tables in {path}")
+    main = max(tables, key=lambda t: tables[t]["rows"])
+    job.rows = sum(t["rows"] for t in tables.values())
+    job.bytes_read = job.total_bytes
+
+    register_database(index_db, name, str(path), str(path), tables[main]["columns"], job.rows,
+                      {"attached": True, "table": main, "tables": tables, "source": source_fp})
+    job.status, job.stage, job.finished = "done", None, time.time()
+    log(f"[✓] Done! {len(tables)} table(s), chat queries go to '{main}' ({job.finished - job.started:.1f}s)")
+    return job.rows
+
+class ImportQueue:
+    """Runs imports on background threads and keeps their progress queryable."""
+
+    def __init__(self, workers=1, on_done=None, **import_kwargs):
+        """`workers` imports run at once; `import_kwargs` go to import_file (e.g. parse_workers, hash_bytes)."""
+        self.jobs = {}
+        self.on_done = on_done
+        self.import_kwargs = import_kwargs
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import")
+        self._lock = threading.Lock()
+
+    def submit(self, path, name, columns=None, **options):
+        """Queue an import; `options` (delta, key, delete_missing, attach) go to import_file."""
+        with self._lock:
+            for job in self.jobs.values():
+                if job.name == name and job.status in ("queued", "running"):
+                    raise ValueError(f"'{name}' is already being imported")
+            job = ImportJob(path, name)
+            self.jobs[job.id] = job
+        self._executor.submit(self._run, job, columns, options)
+        return job
+
+    def _run(self, job, columns, options):
+        try:
+            import_file(job.path, job.name, columns, job=job, **self.import_kwargs, **options)
+        except Exception as e:
+            job.status, job.error, job.finished = "error", str(e), time.time()
+        if self.on_done:
+            self.on_done(job)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return [j.to_dict() for j in sorted(self.jobs.values(), key=lambda j: j.started or 0, reverse=True)]
@@ -0,0 +1,137 @@
+"""Propose indexes from the slow-query log, optionally create them, and refresh planner statistics.
+
+Reads the query shapes that run_query logged as slow (see SLOW_QUERY_MS),
+keeps those whose plan scans a whole table, and proposes an index for each
+column or expression they filter on that no index leads with yet.
+
+Usage:
+    python index_advisor.py [--database NAME] [--all]        # list proposals
+    python index_advisor.py --apply                          # create them, then ANALYZE
+    python index_advisor.py --analyze [--database NAME]      # only refresh sqlite_stat1
+"""
+import argparse
+import re
+import sqlite3
+
+from registry import init_index_db, read_databases
+from slow_queries import SlowQueryLog
+from importer import analyze, ANALYSIS_LIMIT
+
+_WHERE_RE = re.compile(r'\bWHERE\b(.*?)(?:\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|$)', re.I | re.S)
+_COLUMN_RE = re.compile(r'(?<![\w"(])(?:"?[\w\-]+"?\.)?"?([\w\-]+)"?\s*(?:=|IN\b|GLOB\b|>=?|<=?|BETWEEN\b)', re.I)
+_UPPER_RE = re.compile(r'UPPER\("([^"]+)"\)\s*=', re.I)
+_LIKE_RE = re.compile(r'"?([\w\-]+)"?\)?\s+LIKE\b', re.I)
+_INDEX_ON_RE = re.compile(r'\bON\s+"?[\w\-]+"?\s*\((.+)\)\s*$', re.I | re.S)
+
+def _key(expr):
+    return re.sub(r'[\s"]', '', expr).upper()
+
+def candidates(shape, table):
+    """Index expressions that could serve the WHERE clause of `shape` on `table`, and LIKE-filtered columns."""
+    if f'"{table}"' not in shape and f' {table} ' not in f" {shape} ":
+        return [], []
+    m = _WHERE_RE.search(shape)
+    if not m:
+        return [], []
+    where = m.group(1)
+    exprs = [f'"{c}"' for c in _COLUMN_RE.findall(where)]  # may include keywords; advise() keeps real columns
+    exprs += [f'UPPER("{c}")' for c in _UPPER_RE.findall(where)]
+    return list(dict.fromkeys(exprs)), list(dict.fromkeys(_LIKE_RE.findall(where)))
+
+def table_columns(conn, table):
+    return {r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')}
+
+def leading_keys(conn, table):
+    """Normalized first key of every index on `table` (column name or expression)."""
+    keys = set()
+    for (sql,) in conn.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)):
+        m = _INDEX_ON_RE.search(sql)
+        if m:
+            keys.add(_key(m.group(1).split(",")[0]))
+    for (name,) in conn.execute("SELECT name FROM pragma_index_list(?) WHERE origin != 'c'", (table,)):
+        first = conn.execute("SELECT name FROM pragma_index_info(?) WHERE seqno = 0", (name,)).fetchone()
+        if first and first[0]:
+            keys.add(_key(first[0]))
+    return keys
+
+def index_name(table, expr):
+    return f"idx_{table}_" + re.sub(r'\W+', '_', expr.replace('"', '')).strip('_').lower()
+
+def advise(index_db, database=None, include_all=False):
+    """(proposals, notes): indexes worth creating, ranked by the slow-query time they cover."""
+    databases = read_databases(index_db)
+    proposals, notes = {}, []
+    for entry in SlowQueryLog(index_db).list(database, limit=10000):
+        info = databases.get(entry["database"])
+        if not info or not (entry["full_scan"] or include_all):
+            continue
+        if info["immutable"]:
+            notes.append(f"{entry['database']}: attached in place (read-only); create indexes in the source file itself")
+            continue
+        table = entry["database"]
+        exprs, like_cols = candidates(entry["shape"], table)
+        conn = sqlite3.connect(info["db_path"])
+        existing, columns = leading_keys(conn, table), table_columns(conn, table)
+        conn.close()
+        # drops keywords and the "__key" of keyset paging, which is not a column
+        exprs = [e for e in exprs if re.search(r'"([^"]+)"', e).group(1) in columns]
+        like_cols = [c for c in like_cols if c in columns]
+        for expr in exprs:
+            if _key(expr) in existing:
+                continue
+            p = proposals.setdefault((table, expr), {
+                "database": table, "db_path": info["db_path"], "expression": expr,
+                "sql": f'CREATE INDEX IF NOT EXISTS "{index_name(table, expr)}" ON "{table}" ({expr})',
+                "queries": 0, "total_ms": 0.0})
+            p["queries"] += entry["count"]
+            p["total_ms"] += entry["total_ms"]
+        if like_cols and not exprs:
+            notes.append(f"{table}: LIKE on {', '.join(like_cols)} cannot use a B-tree index "
+                         f"({entry['count']}x, {entry['total_ms']:.0f} ms); only the FTS index serves substring search")
+    return sorted(proposals.values(), key=lambda p: -p["total_ms"]), list(dict.fromkeys(notes))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--index-db", default="data/datachat_index.db")
+    ap.add_argument("--database", help="only this database")
+    ap.add_argument("--all", action="store_true", help="also consider slow queries whose plan uses an index")
+    ap.add_argument("--apply", action="store_true", help="create the proposed indexes, then ANALYZE")
+    ap.add_argument("--analyze", action="store_true", help="refresh sqlite_stat1 of the databases")
+    ap.add_argument("--analysis-limit", type=int, default=ANALYSIS_LIMIT, help="rows sampled per index (0 = all)")
+    ap.add_argument("--clear", action="store_true", help="empty the slow-query log afterwards")
+    args = ap.parse_args()
+    init_index_db(args.index_db)
+
+    proposals, notes = advise(args.index_db, args.database, args.all)
+    if not proposals:
+        print("No index to propose.")
+    for p in proposals:
+        print(f"{p['database']:<20} {p['queries']:>6}x {p['total_ms']:>10.0f} ms  {p['sql']}")
+    for note in notes:
+        print(f"[i] {note}")
+
+    touched = set()
+    if args.apply:
+        for p in proposals:
+            conn = sqlite3.connect(p["db_path"])
+            conn.execute(p["sql"])
+            conn.commit()
+            conn.close()
+            touched.add(p["database"])
+            print(f"[✓] {p['sql']}")
+    if args.apply or args.analyze:
+        databases = read_databases(args.index_db)
+        names = touched if args.apply and not args.analyze else [args.database] if args.database else databases
+        for name in names:
+            if databases[name]["immutable"]:
+                print(f"[i] {name} is attached in place; skipped")
+                continue
+            conn = sqlite3.connect(databases[name]["db_path"])
+            analyze(conn, args.analysis_limit)
+            conn.close()
+            print(f"[✓] ANALYZE {name}")
+    if args.clear:
+        SlowQueryLog(args.index_db).clear(args.database)
+
+if __name__ == "__main__":
+    main()
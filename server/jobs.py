@@ -0,0 +1,109 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+class QueueFull(Exception):
+    pass
+
+class Job:
+    """One unit of background work and the progress events it has emitted so far."""
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.events = []
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ("done", "error")
+
+    def emit(self, event, **data):
+        with self._cond:
+            self.events.append({"event": event, "data": data})
+            self._cond.notify_all()
+
+    def wait_events(self, after, timeout=15):
+        """Events past index `after`, blocking up to `timeout` seconds for new ones."""
+        with self._cond:
+            if len(self.events) <= after:
+                self._cond.wait(timeout)
+            return self.events[after:]
+
+    def to_dict(self):
+        end = self.finished or time.time()
+        return {
+            "id": self.id, "kind": self.kind, "status": self.status,
+            "queued_for": round((self.started or end) - self.created, 3),
+            "elapsed": round(end - self.started, 3) if self.started else 0,
+            "stage": next((e["data"].get("stage") for e in reversed(self.events) if e["event"] == "progress"), None),
+            "result": self.result, "error": self.error
+        }
+
+class JobQueue:
+    """Bounded pool of worker threads with a limit on jobs waiting for one.
+
+    `submit` raises QueueFull instead of queueing past `max_pending`, so a
+    burst of slow work is refused up front rather than piling up. Finished
+    jobs are kept (newest `keep`) so their results can still be fetched.
+    """
+
+    def __init__(self, workers=2, max_pending=8, keep=200, name="job"):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keep = keep
+        self.jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args):
+        """Run `fn(job, *args)` in the pool; its return value becomes the job result."""
+        with self._lock:
+            if self._count("queued") >= self.max_pending:
+                raise QueueFull(f"{self.max_pending} {kind} jobs already waiting")
+            job = Job(kind)
+            self.jobs[job.id] = job
+            self._prune()
+        job.emit("status", status="queued")
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        job.status, job.started = "running", time.time()
+        job.emit("status", status="running")
+        try:
+            job.result = fn(job, *args)
+            job.status = "done"
+        except Exception as e:
+            job.status, job.error = "error", str(e)
+        job.finished = time.time()
+        if job.error:
+            job.emit("error", error=job.error)
+        else:
+            job.emit("done", result=job.result)
+
+    def _count(self, status):
+        return sum(1 for j in self.jobs.values() if j.status == status)
+
+    def _prune(self):
+        finished = sorted((j for j in self.jobs.values() if j.done), key=lambda j: j.finished)
+        for job in finished[:max(0, len(finished) - self.keep)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return [j.to_dict() for j in sorted(self.jobs.values(), key=lambda j: j.created, reverse=True)]
+
+    def stats(self):
+        with self._lock:
+            return {"workers": self.workers, "max_pending": self.max_pending,
+                    "queued": self._count("queued"), "running": self._count("running")}
@@ -0,0 +1,82 @@
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+class MessageLog:
+    """Write-behind store for conversations and chat messages.
+
+    Request handlers only enqueue; one writer thread owns the index DB
+    connection (WAL) and commits whatever has queued up in a single
+    transaction, bumping `conversations.updated_at` for each conversation it
+    touched. `flush` lets readers wait for writes they depend on.
+    """
+
+    def __init__(self, path, batch=500):
+        self.path = str(path)
+        self.batch = batch
+        self._queue = queue.Queue()
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._written = 0
+        self._thread = threading.Thread(target=self._run, name="message-log", daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        with self._cond:
+            self._enqueued += 1
+        self._queue.put(item)
+
+    def create_conversation(self, conv_id, title):
+        now = datetime.now().isoformat()
+        self._put(("conversation", (conv_id, title, now, now)))
+
+    def log(self, conv_id, role, content, sql=None, results_count=None):
+        self._put(("message", (conv_id, role, content, sql, results_count, datetime.now().isoformat())))
+
+    def flush(self, timeout=2.0):
+        """Wait until everything enqueued so far is committed; False on timeout."""
+        with self._cond:
+            target = self._enqueued
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self, timeout=5.0):
+        self.flush(timeout)
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in items
+            items = [i for i in items if i is not None]
+            try:
+                self._write(conn, items)
+            except sqlite3.Error as e:
+                print(f"[message-log] dropped {len(items)} writes: {e}")
+                conn.rollback()
+            with self._cond:
+                self._written += len(items)
+                self._cond.notify_all()
+            if stop:
+                conn.close()
+                return
+
+    def _write(self, conn, items):
+        touched = {}
+        with conn:
+            for kind, row in items:
+                if kind == "conversation":
+                    conn.execute("INSERT OR IGNORE INTO conversations (id, title, created_at, updated_at) VALUES (?,?,?,?)", row)
+                else:
+                    conn.execute("INSERT INTO messages (conversation_id, role, content, sql_query, results_count, created_at) VALUES (?,?,?,?,?,?)", row)
+                    touched[row[0]] = row[5]
+            conn.executemany("UPDATE conversations SET updated_at = ? WHERE id = ?", [(t, c) for c, t in touched.items()])
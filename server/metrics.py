@@ -0,0 +1,133 @@
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+class Metrics:
+    """In-process latency histograms and counters, rendered as Prometheus text.
+
+    `span` times one stage of a request into the `<prefix>_stage_seconds`
+    histogram, and appends it to the calling thread's current `trace` (if
+    any) so a response can report where its own time went.
+    """
+
+    def __init__(self, prefix="datachat", buckets=BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe(self, name, seconds, help=None, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(_labels(labels))
+            if hist is None:
+                hist = series[_labels(labels)] = Histogram(self.buckets)
+            hist.observe(seconds)
+            if help:
+                self._help.setdefault(name, help)
+
+    def inc(self, name, value=1, help=None, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    @contextmanager
+    def trace(self):
+        """Collect the spans timed on this thread into the yielded list."""
+        previous = getattr(self._local, "spans", None)
+        spans = self._local.spans = []
+        try:
+            yield spans
+        finally:
+            self._local.spans = previous
+
+    @contextmanager
+    def span(self, stage, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe("stage_seconds", seconds, help="Time spent in each request stage", stage=stage, **labels)
+            spans = getattr(self._local, "spans", None)
+            if spans is not None:
+                spans.append({"stage": stage, "ms": round(seconds * 1000, 2)})
+
+    @contextmanager
+    def timed(self, name, labels, help=None):
+        """Observe the duration of the block into `name`, with `labels` read at exit
+        (so the block can fill in labels it only learns on the way)."""
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(name, time.perf_counter() - start, help=help, **labels)
+
+    def render(self, gauges=None, totals=None):
+        """Prometheus text exposition.
+
+        `gauges` (current values) and `totals` (monotonic counts kept
+        elsewhere) are {name: value or [(labels dict, value), ...]}.
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {full} histogram")
+                for labels, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, n in zip(hist.buckets, hist.counts):
+                        cumulative += n
+                        lines.append(f"{full}_bucket{_fmt(labels, [('le', repr(float(bound)))])} {cumulative}")
+                    lines.append(f"{full}_bucket{_fmt(labels, [('le', '+Inf')])} {hist.count}")
+                    lines.append(f"{full}_sum{_fmt(labels)} {hist.sum:.6f}")
+                    lines.append(f"{full}_count{_fmt(labels)} {hist.count}")
+            for name, series in sorted(self._counters.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {full} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{full}{_fmt(labels)} {value}")
+        for kind, values in (("gauge", gauges), ("counter", totals)):
+            for name, value in sorted((values or {}).items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} {kind}")
+                for labels, v in (value if isinstance(value, list) else [({}, value)]):
+                    lines.append(f"{full}{_fmt(_labels(labels))} {v}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,183 @@
+import re
+from search_index import match_expr
+from aggregates import count_sql
+from normalize import fold, norm_email, norm_phone, norm_cp
+from schema_profile import build_profile
+
+COUNT_KEYWORDS = ('combien', 'nombre', 'count', 'total', 'nb ', 'how many', 'how much')
+MATRICULE_KEYWORDS = ('caf', 'allocataire', 'aah', 'organisme')
+CITY_STOPWORDS = frozenset(['LE', 'LA', 'LES', 'UN', 'UNE', 'DES', 'THE', 'A'])
+COMMON_LOWER = frozenset({
+    'cherche','trouve','recherche','moi','les','des','dans','la','le','un','une',
+    'qui','que','est','sont','avec','pour','sur','de','du','au','aux','info',
+    'informations','donne','montre','affiche','tout','tous','toutes','base',
+    'données','database','personnes','personne','gens','liste','boulanger','caf',
+    'fait','faire','approfondie','aprofondie','profonde','rechercher','cherhce',
+    'details','detail','fiche','profil','osint','analyse','analyser','rapport',
+    'propos','infos','chercher','trouver','donner','montrer','afficher','lister',
+    'combien','nombre','total','count','email','telephone','adresse','ville',
+    'code','postal','nom','prenom','where','from','select',
+    'find','search','look','lookup','get','show','give','tell','about',
+    'the','and','for','with','this','that','what','who','how','many',
+    'people','person','user','users','information','data','deep',
+    'scan','report','profile','investigate','investigation','check',
+    'all','any','some','please','can','you','me','his','her','their',
+    'address','city','phone','name','first','last','number','results',
+    'much','more','list','display','fetch','query','run'})
+
+DEPT_RE = re.compile(r'\b(\d{2})\b')
+CP_RE = re.compile(r'\b(\d{5})\b')
+CITY_RE = re.compile(r'(?:à|a|de|dans|sur|in|from|at)\s+([A-ZÀ-Üa-zà-ü\s\-]+)')
+EMAIL_RE = re.compile(r'[\w.\-]+@[\w.\-]+\.\w+')
+PHONE_RE = re.compile(r'(\+33|0[67])\s*\d[\d\s]{7,}')
+SPACE_RE = re.compile(r'\s')
+
+class DbMatcher:
+    """Picks the database a chat message is about.
+
+    Compiled once per registry load: the first database named in the message
+    (one regex over all names), else a database with a matricule column for
+    CAF-style questions, else the first ready database.
+    """
+
+    def __init__(self, databases, profiles=None):
+        profiles = profiles or {}
+        names = sorted(databases, key=len, reverse=True)
+        self._by_lower = {n.lower(): n for n in reversed(list(databases))}
+        self._names_re = re.compile("|".join(re.escape(n.lower()) for n in names)) if names else None
+        self._matricule = next((n for n in databases if n in profiles and profiles[n]["roles"]["matricule"]), None)
+        self._ready = next((n for n in databases if databases[n]["status"] == "ready"), None)
+
+    def match(self, query):
+        q = query.lower()
+        if self._names_re:
+            m = self._names_re.search(q)
+            if m:
+                return self._by_lower[m.group()]
+        if self._matricule and any(kw in q for kw in MATRICULE_KEYWORDS):
+            return self._matricule
+        return self._ready
+
+def query_intent(user_msg):
+    """Coarse label for what a chat message asks (metrics only): count, email, phone, postcode, name or browse."""
+    if any(kw in user_msg.lower() for kw in COUNT_KEYWORDS):
+        return "count"
+    if EMAIL_RE.search(user_msg):
+        return "email"
+    if PHONE_RE.search(user_msg):
+        return "phone"
+    if CP_RE.search(user_msg):
+        return "postcode"
+    if any(w.lower() not in COMMON_LOWER and len(w) > 1 and not w.isdigit() for w in user_msg.split()):
+        return "name"
+    return "browse"
+
+def parse_query(user_msg, db_name, columns, meta=None, profile=None):
+    """Translate a chat message into (sql, params).
+
+    User values are always bound as parameters, so every message of the same
+    shape maps to the same SQL text and reuses one prepared statement.
+    `db_name` is the table the SQL reads (registry info["table"]).
+    `meta` is the registry metadata of the database: when it lists an FTS
+    index, count summaries or normalized shadow columns, the matching intents
+    use them instead of scanning the raw table. `profile` is the database's
+    compiled schema profile; it is built on the fly when not given.
+    """
+    meta = meta or {}
+    profile = profile or build_profile(columns, meta, table=db_name)
+    fts = meta.get("fts")
+    aggregates = meta.get("aggregates")
+    shadow = meta.get("shadow") or {}
+    roles = profile["roles"]
+    sel = profile["select"]
+    q = user_msg.lower()
+    cp_col = roles["cp"]
+    
+    if any(kw in q for kw in COUNT_KEYWORDS):
+        dept = DEPT_RE.search(user_msg)
+        cp = CP_RE.search(user_msg)
+        
+        if cp and cp_col:
+            agg = count_sql(aggregates, "cp", cp_col)
+            if agg:
+                return agg, [cp.group(1)]
+            if cp_col in shadow:
+                return f'SELECT COUNT(*) as total FROM "{db_name}" WHERE "{shadow[cp_col]}" = ?', [norm_cp(cp.group(1))]
+            return f'SELECT COUNT(*) as total FROM "{db_name}" WHERE "{cp_col}" = ?', [cp.group(1)]
+        
+        if dept and cp_col:
+            agg = count_sql(aggregates, "dept", cp_col)
+            if agg:
+                return agg, [dept.group(1)]
+            if cp_col in shadow:
+                return f'SELECT COUNT(*) as total FROM "{db_name}" WHERE "{shadow[cp_col]}" GLOB ?', [f"{dept.group(1)}*"]
+            return f'SELECT COUNT(*) as total FROM "{db_name}" WHERE "{cp_col}" LIKE ?', [f"{dept.group(1)}%"]
+        
+        city_match = CITY_RE.search(q)
+        if city_match:
+            city = city_match.group(1).strip().upper()
+            city_col = roles["city"]
+            if city not in CITY_STOPWORDS and city_col:
+                agg = count_sql(aggregates, "city", city_col)
+                return agg or f'SELECT COUNT(*) as total FROM "{db_name}" WHERE UPPER("{city_col}") LIKE ?', [f"%{city}%"]
+        
+        return count_sql(aggregates, "total") or f'SELECT COUNT(*) as total FROM "{db_name}"', []
+    
+    email = EMAIL_RE.search(user_msg)
+    email_col = roles["email"]
+    if email and email_col:
+        if email_col in shadow:
+            return f'SELECT {sel} FROM "{db_name}" WHERE "{shadow[email_col]}" = ? LIMIT 50', [norm_email(email.group())]
+        return f'SELECT {sel} FROM "{db_name}" WHERE UPPER("{email_col}") = UPPER(?) LIMIT 50', [email.group()]
+    
+    phone = PHONE_RE.search(user_msg)
+    phone_col = roles["phone"]
+    if phone and phone_col:
+        ph = SPACE_RE.sub('', phone.group())
+        if phone_col in shadow:
+            return f'SELECT {sel} FROM "{db_name}" WHERE "{shadow[phone_col]}" = ? LIMIT 50', [norm_phone(ph)]
+        return f'SELECT {sel} FROM "{db_name}" WHERE "{phone_col}" LIKE ? LIMIT 50', [f"%{ph}%"]
+    
+    cp = CP_RE.search(user_msg)
+    if cp and cp_col:
+        if cp_col in shadow:
+            return f'SELECT {sel} FROM "{db_name}" WHERE "{shadow[cp_col]}" = ? LIMIT 50', [norm_cp(cp.group(1))]
+        return f'SELECT {sel} FROM "{db_name}" WHERE "{cp_col}" = ? LIMIT 50', [cp.group(1)]
+    
+    caps_words = [w for w in user_msg.split() if w.isupper() and len(w) > 1 and not w.isdigit()]
+    
+    if caps_words:
+        words = caps_words
+    else:
+        words = [w for w in user_msg.split() if w.lower() not in COMMON_LOWER and len(w) > 1 and not w.isdigit()]
+    
+    if words:
+        if fts:
+            terms = words if len(words) >= 2 else words[:1]
+            expr = match_expr(terms)
+            if expr:
+                ft = fts["table"]
+                return f'SELECT {profile["fts_select"]} FROM "{ft}" JOIN "{db_name}" ON "{db_name}".rowid = "{ft}".rowid WHERE "{ft}" MATCH ? LIMIT 50', [expr]
+        name_cols = roles["name"]
+        search_cols = roles["search"]
+        like = 'UPPER("{}") LIKE UPPER(?)'
+        if profile["name_shadows"]:
+            # without FTS, match each word anywhere in the folded copies, so accents don't matter
+            name_cols = search_cols = profile["name_shadows"]
+            words = [fold(w) for w in words]
+            like = '"{}" LIKE ?'
+        if name_cols and len(words) >= 2:
+            word_conds = []
+            params = []
+            for w in words:
+                w_cond = " OR ".join([like.format(c) for c in name_cols])
+                word_conds.append(f"({w_cond})")
+                params += [f"%{w}%"] * len(name_cols)
+            conds_and = " AND ".join(word_conds)
+            return f'SELECT {sel} FROM "{db_name}" WHERE {conds_and} LIMIT 50', params
+        else:
+            search = words[0]
+            conds = " OR ".join([like.format(c) for c in search_cols])
+            return f'SELECT {sel} FROM "{db_name}" WHERE {conds} LIMIT 50', [f"%{search}%"] * len(search_cols)
+    
+    return f'SELECT {sel} FROM "{db_name}" LIMIT 20', []
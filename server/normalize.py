@@ -0,0 +1,67 @@
+import re
+import unicodedata
+
+SHADOW_SUFFIX = "__n"
+NAME_KEYWORDS = ['nom', 'name', 'prenom', 'nom_complet']
+EMAIL_KEYWORDS = ['email', 'mail', 'courriel']
+PHONE_KEYWORDS = ['tel', 'phone', 'telephone']
+CP_KEYWORDS = ['code_postal', 'cp', 'postal', 'adresse_code_postal']
+CITY_KEYWORDS = ['ville', 'commune', 'city']
+
+def fold(v):
+    """Uppercase, accents stripped, whitespace collapsed."""
+    if v is None:
+        return None
+    v = unicodedata.normalize('NFKD', str(v)).encode('ascii', 'ignore').decode()
+    return " ".join(v.upper().split())
+
+def norm_email(v):
+    if v is None:
+        return None
+    return fold(v).replace(" ", "")
+
+def norm_phone(v):
+    """Digits-only E.164 (no '+'); French national numbers get the 33 prefix."""
+    if v is None:
+        return None
+    v = str(v).strip()
+    digits = re.sub(r'\D', '', v)
+    if v.startswith('+'):
+        return digits
+    if digits.startswith('00'):
+        return digits[2:]
+    if len(digits) == 10 and digits.startswith('0'):
+        return '33' + digits[1:]
+    return digits
+
+def norm_cp(v):
+    if v is None:
+        return None
+    v = str(v).strip().upper().replace(" ", "")
+    if v.isdigit() and len(v) < 5:
+        v = v.zfill(5)
+    return v
+
+NORMALIZERS = {"name": fold, "email": norm_email, "phone": norm_phone, "cp": norm_cp}
+
+def matching_columns(columns, keywords):
+    """Columns whose name contains one of `keywords`, in table order."""
+    return [c for c in columns if any(k in c for k in keywords)]
+
+def shadow_plan(columns):
+    """[(column index, kind, shadow column)] for the columns parse_query filters on.
+
+    Mirrors the parser's column choice: every name column, and the first
+    email, phone and postcode column.
+    """
+    plan = []
+    for c in matching_columns(columns, NAME_KEYWORDS):
+        plan.append((columns.index(c), "name", c + SHADOW_SUFFIX))
+    for kind, keywords in (("email", EMAIL_KEYWORDS), ("phone", PHONE_KEYWORDS), ("cp", CP_KEYWORDS)):
+        cols = matching_columns(columns, keywords)
+        if cols and cols[0] + SHADOW_SUFFIX not in [p[2] for p in plan]:
+            plan.append((columns.index(cols[0]), kind, cols[0] + SHADOW_SUFFIX))
+    return plan
+
+def add_shadow(row, plan):
+    return list(row) + [NORMALIZERS[kind](row[i]) for i, kind, _ in plan]
@@ -0,0 +1,67 @@
+import base64
+import json
+import re
+
+from search_index import fts_table
+
+KEY_COLUMN = "__key"
+_SOURCE_RE = re.compile(r'^\s*SELECT\s+.+?\s+FROM\s+("?)([\w\-]+)\1', re.I | re.S)
+_LIMIT_RE = re.compile(r'\s+LIMIT\s+(\d+)\s*;?\s*$', re.I)
+_UNPAGEABLE_RE = re.compile(r'\b(LIMIT|OFFSET|ORDER\s+BY|GROUP\s+BY|DISTINCT|UNION|JOIN|COUNT|SUM|AVG|MIN|MAX)\b', re.I)
+
+def keyset_sql(sql, tables):
+    """Rewrite a row query on one of `tables` into one page of a keyset scan.
+
+    Returns (sql, cap) or None. The trailing LIMIT is dropped and returned as
+    `cap` (None without one), the number of rows the caller should serve
+    across all pages; rows are ordered by the rowid of the table (or of its
+    FTS index, which shares the rowid for MATCH queries), so each page starts
+    with an index seek past the previous one instead of an OFFSET. The
+    returned SQL takes two extra parameters after the query's own: the last
+    key of the previous page and the number of rows to fetch.
+    Queries that aggregate, sort or join are not paged, except the 1:1 join
+    of an FTS index to its table on rowid; `tables` must only list tables
+    that have a rowid.
+    """
+    m = _SOURCE_RE.match(sql)
+    if not m:
+        return None
+    source = m.group(2)
+    table = next((t for t in tables if source in (t, fts_table(t))), None)
+    if table is None or re.match(r'\s*,', sql[m.end():]):
+        return None
+    limit = _LIMIT_RE.search(sql)
+    inner = sql[:limit.start()] if limit else sql
+    checked = inner
+    if source != table:
+        checked = re.sub(rf'\bJOIN\s+"?{re.escape(table)}"?\s+ON\s+"?{re.escape(table)}"?\.rowid\s*=\s*"?{re.escape(source)}"?\.rowid\b',
+                         '', inner, count=1, flags=re.I)
+    if _UNPAGEABLE_RE.search(checked):
+        return None
+    inner = re.sub(r'^\s*SELECT\s+', f'SELECT "{source}".rowid AS "{KEY_COLUMN}", ', inner, count=1, flags=re.I)
+    return (f'SELECT * FROM ({inner}) WHERE "{KEY_COLUMN}" > ? ORDER BY "{KEY_COLUMN}" LIMIT ?',
+            int(limit.group(1)) if limit else None)
+
+def without_limit(sql, tables):
+    """`sql` without its trailing LIMIT when keyset_sql can page it, so the LIMIT doesn't cap the pages; otherwise `sql`."""
+    return _LIMIT_RE.sub('', sql) if keyset_sql(sql, tables) else sql
+
+def encode_cursor(version, key, served):
+    return base64.urlsafe_b64encode(json.dumps([version, key, served]).encode()).decode().rstrip("=")
+
+def decode_cursor(token, version, cap=None):
+    """(last key of the previous page, rows served so far).
+
+    Rejects tokens issued before a re-import, and tokens that already
+    served `cap` rows (a query's LIMIT), which no page follows.
+    """
+    try:
+        token_version, key, served = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        key, served = int(key), int(served)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if token_version != version:
+        raise ValueError("Cursor expired: the database was re-imported")
+    if served < 0 or (cap is not None and served >= cap):
+        raise ValueError("Invalid cursor: no rows left under the query's LIMIT")
+    return key, served
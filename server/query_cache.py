@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+def result_size(result):
+    """Rough in-memory footprint of a run_query result, in bytes."""
+    size = 200 + sum(len(c) + 50 for c in result["columns"])
+    for row in result["rows"]:
+        size += 64
+        for v in row.values():
+            size += 32 + (len(v) if isinstance(v, (str, bytes)) else 8)
+    return size
+
+class QueryCache:
+    """LRU cache of query results bounded by approximate memory and TTL.
+
+    Keys are (database, version, sql, params); `version` is the database's
+    `imported_at`, so a re-import never serves results from the old data even
+    before `invalidate` drops them.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl=600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(db_name, version, sql, params):
+        """Cache key of a query, or None when its params can't be hashed (then it is not cached)."""
+        if isinstance(params, Mapping):
+            params = tuple(sorted(params.items()))
+        key = (db_name, version, sql, tuple(params or ()))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            result, size, expires = entry
+            if expires < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        if key is None:
+            return
+        size = result_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (result, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, db_name=None):
+        with self._lock:
+            for key in [k for k in self._entries if db_name is None or k[0] == db_name]:
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "ttl": self.ttl, "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
@@ -0,0 +1,100 @@
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+PROGRESS_STEPS = 10000  # SQLite VM instructions between budget checks
+
+class QueryTimeout(Exception):
+    """A query ran past its time or step budget, or was cancelled."""
+
+    def __init__(self, message, cancelled=False):
+        super().__init__(message)
+        self.cancelled = cancelled
+
+class RunningQuery:
+    def __init__(self, endpoint, database, sql, seconds=None, steps=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.endpoint = endpoint
+        self.database = database
+        self.sql = sql
+        self.seconds = seconds
+        self.steps = steps
+        self.started = time.time()
+        self.deadline = self.started + seconds if seconds else None
+        self.executed = 0
+        self.reason = None
+
+    def check(self):
+        """Progress handler: a non-zero return makes SQLite abort the statement."""
+        self.executed += PROGRESS_STEPS
+        if self.reason:
+            return 1
+        if self.deadline and time.time() > self.deadline:
+            self.reason = f"Query exceeded its {self.seconds}s budget"
+        elif self.steps and self.executed > self.steps:
+            self.reason = f"Query exceeded its budget of {self.steps:,} steps"
+        return 1 if self.reason else 0
+
+    def to_dict(self):
+        return {"id": self.id, "endpoint": self.endpoint, "database": self.database, "sql": self.sql,
+                "elapsed": round(time.time() - self.started, 3), "steps": self.executed,
+                "budget": {"seconds": self.seconds, "steps": self.steps}}
+
+class QueryGuard:
+    """Time and VM-step budgets for queries on pooled connections, and a list of those in flight.
+
+    `budgets` maps an endpoint name to (seconds, steps); None means no limit.
+    The budget is enforced by a progress handler installed for the duration
+    of `track`, which also aborts a query flagged by `cancel`. The handler is
+    removed before the connection goes back to its pool.
+    """
+
+    def __init__(self, budgets):
+        self.budgets = dict(budgets)
+        self.running = {}
+        self.timeouts = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, conn, endpoint, database, sql):
+        seconds, steps = self.budgets.get(endpoint, (None, None))
+        query = RunningQuery(endpoint, database, sql, seconds, steps)
+        with self._lock:
+            self.running[query.id] = query
+        conn.set_progress_handler(query.check, PROGRESS_STEPS)
+        try:
+            yield query
+        except sqlite3.OperationalError as e:
+            if not query.reason:
+                raise
+            cancelled = query.reason == "cancelled"
+            with self._lock:
+                if cancelled:
+                    self.cancelled += 1
+                else:
+                    self.timeouts += 1
+            raise QueryTimeout("Query cancelled" if cancelled else query.reason, cancelled) from e
+        finally:
+            conn.set_progress_handler(None, 0)
+            with self._lock:
+                self.running.pop(query.id, None)
+
+    def cancel(self, query_id):
+        """Flag a running query; it stops at its next progress check. False if not running."""
+        with self._lock:
+            query = self.running.get(query_id)
+            if query:
+                query.reason = "cancelled"
+        return query is not None
+
+    def list(self):
+        with self._lock:
+            queries = list(self.running.values())
+        return [q.to_dict() for q in sorted(queries, key=lambda q: q.started)]
+
+    def stats(self):
+        with self._lock:
+            return {"running": len(self.running), "timeouts": self.timeouts, "cancelled": self.cancelled}
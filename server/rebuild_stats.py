@@ -0,0 +1,22 @@
+"""Recount the /api/stats counters from the index DB tables.
+
+The counters are kept up to date by triggers; run this after editing the
+index DB by hand or restoring it from a backup.
+
+Usage: python rebuild_stats.py [--index-db data/datachat_index.db]
+"""
+import argparse
+import sqlite3
+from registry import init_index_db, rebuild_stats
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--index-db", default="data/datachat_index.db")
+    args = ap.parse_args()
+    init_index_db(args.index_db)
+    conn = sqlite3.connect(args.index_db)
+    with conn:
+        counts = rebuild_stats(conn)
+    conn.close()
+    for key, value in counts.items():
+        print(f"{key:<14} {value:,}")
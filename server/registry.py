@@ -0,0 +1,178 @@
+import sqlite3
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+STATS_KEYS = ("databases", "records", "conversations", "queries")
+STATS_TRIGGERS = {
+    "stats_conversations_ins": "AFTER INSERT ON conversations BEGIN UPDATE stats SET value = value + 1 WHERE key = 'conversations'; END",
+    "stats_conversations_del": "AFTER DELETE ON conversations BEGIN UPDATE stats SET value = value - 1 WHERE key = 'conversations'; END",
+    "stats_queries_ins": "AFTER INSERT ON messages WHEN NEW.role = 'user' BEGIN UPDATE stats SET value = value + 1 WHERE key = 'queries'; END",
+    "stats_queries_del": "AFTER DELETE ON messages WHEN OLD.role = 'user' BEGIN UPDATE stats SET value = value - 1 WHERE key = 'queries'; END",
+    "stats_databases_ins": """AFTER INSERT ON databases BEGIN
+        UPDATE stats SET value = value + 1 WHERE key = 'databases';
+        UPDATE stats SET value = value + COALESCE(NEW.row_count, 0) WHERE key = 'records'; END""",
+    "stats_databases_upd": """AFTER UPDATE OF row_count ON databases BEGIN
+        UPDATE stats SET value = value + COALESCE(NEW.row_count, 0) - COALESCE(OLD.row_count, 0) WHERE key = 'records'; END""",
+    "stats_databases_del": """AFTER DELETE ON databases BEGIN
+        UPDATE stats SET value = value - 1 WHERE key = 'databases';
+        UPDATE stats SET value = value - COALESCE(OLD.row_count, 0) WHERE key = 'records'; END""",
+}
+
+def rebuild_stats(conn):
+    """Recount every stats row from the underlying tables (recovery after drift)."""
+    counts = {
+        "databases": conn.execute("SELECT COUNT(*) FROM databases").fetchone()[0],
+        "records": conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM databases").fetchone()[0],
+        "conversations": conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0],
+        "queries": conn.execute("SELECT COUNT(*) FROM messages WHERE role = 'user'").fetchone()[0],
+    }
+    conn.executemany("INSERT OR REPLACE INTO stats (key, value) VALUES (?, ?)", counts.items())
+    return counts
+
+def read_stats(path):
+    conn = sqlite3.connect(str(path))
+    stats = dict(conn.execute("SELECT key, value FROM stats").fetchall())
+    conn.close()
+    return stats
+
+def init_index_db(path):
+    conn = sqlite3.connect(str(path))
+    conn.execute("""CREATE TABLE IF NOT EXISTS databases (
+        name TEXT PRIMARY KEY, source_path TEXT, db_path TEXT,
+        tables TEXT, row_count INTEGER, status TEXT, imported_at TEXT, meta TEXT)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS conversations (
+        id TEXT PRIMARY KEY, title TEXT, created_at TEXT, updated_at TEXT)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id TEXT,
+        role TEXT, content TEXT, sql_query TEXT, results_count INTEGER, created_at TEXT)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS profiles (
+        name TEXT PRIMARY KEY, version INTEGER, imported_at TEXT, built_at TEXT, profile TEXT)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS summaries (
+        key TEXT PRIMARY KEY, model TEXT, response TEXT, bytes INTEGER, created_at REAL, last_used REAL)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS slow_queries (
+        database TEXT, shape TEXT, count INTEGER, total_ms REAL, max_ms REAL, last_ms REAL, rows INTEGER,
+        plan TEXT, full_scan INTEGER, first_seen TEXT, last_seen TEXT, PRIMARY KEY (database, shape)) WITHOUT ROWID""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_used ON summaries (last_used)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations (updated_at)")
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+        # updated_at used to be left at the creation time; rebuild it from the messages once
+        conn.execute("""UPDATE conversations SET updated_at = COALESCE(
+            (SELECT MAX(created_at) FROM messages WHERE conversation_id = conversations.id), updated_at)""")
+        conn.execute("PRAGMA user_version = 1")
+    conn.execute("CREATE TABLE IF NOT EXISTS registry_version (version INTEGER NOT NULL)")
+    if conn.execute("SELECT COUNT(*) FROM registry_version").fetchone()[0] == 0:
+        conn.execute("INSERT INTO registry_version VALUES (0)")
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(databases)")]
+    if "meta" not in cols:
+        conn.execute("ALTER TABLE databases ADD COLUMN meta TEXT")
+    conn.execute("CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID")
+    for trigger, body in STATS_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger} {body}")
+    if conn.execute("SELECT COUNT(*) FROM stats").fetchone()[0] < len(STATS_KEYS):
+        rebuild_stats(conn)
+    conn.commit()
+    conn.close()
+
+def register_database(path, name, source_path, db_path, columns, row_count, meta=None, status='ready'):
+    init_index_db(path)
+    conn = sqlite3.connect(str(path))
+    # an upsert rather than INSERT OR REPLACE, so re-imports fire the stats update trigger
+    conn.execute("""INSERT INTO databases
+        (name, source_path, db_path, tables, row_count, status, imported_at, meta) VALUES (?,?,?,?,?,?,?,?)
+        ON CONFLICT(name) DO UPDATE SET source_path = excluded.source_path, db_path = excluded.db_path,
+        tables = excluded.tables, row_count = excluded.row_count, status = excluded.status,
+        imported_at = excluded.imported_at, meta = excluded.meta""",
+        (name, source_path, db_path, json.dumps(columns), row_count, status,
+         time.strftime('%Y-%m-%dT%H:%M:%S'), json.dumps(meta or {})))
+    conn.execute("UPDATE registry_version SET version = version + 1")
+    conn.commit()
+    conn.close()
+
+Snapshot = namedtuple("Snapshot", "version databases derived")
+
+def read_databases(path):
+    """{name: read-only info} for every registered database whose file exists.
+
+    `table` is the table chat queries go to: the database's own name, or the
+    main table of a file attached in place (`immutable`).
+    """
+    conn = sqlite3.connect(str(path))
+    rows = conn.execute("SELECT name, source_path, db_path, tables, row_count, status, imported_at, meta FROM databases").fetchall()
+    conn.close()
+    loaded = {}
+    for name, source_path, db_path, tables, row_count, status, imported_at, meta in rows:
+        if db_path and os.path.exists(db_path):
+            meta = json.loads(meta) if meta else {}
+            loaded[name] = MappingProxyType({
+                "source_path": source_path, "db_path": db_path,
+                "columns": json.loads(tables) if tables else [],
+                "row_count": row_count, "status": status, "imported_at": imported_at,
+                "meta": meta, "table": meta.get("table") or name, "immutable": bool(meta.get("attached"))
+            })
+    return loaded
+
+def _file_stamp(path):
+    stamp = []
+    for p in (str(path), str(path) + "-wal"):
+        try:
+            st = os.stat(p)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+class Registry:
+    """In-memory view of the `databases` table, shared by all request threads.
+
+    Readers get an immutable Snapshot that is swapped as a whole, so they never
+    see a half-loaded registry. At most every `interval` seconds a read
+    checks the index DB's mtime, and only when it moved, the registry version
+    that register_database bumps; the table is re-read only when that
+    changed. `derive(databases)` computes per-snapshot extras (kept in
+    `snapshot.derived`) and `on_change(old, new)` runs after each swap.
+    """
+
+    def __init__(self, path, derive=None, on_change=None, interval=2.0):
+        self.path = path
+        self.derive = derive
+        self.on_change = on_change
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._snapshot = Snapshot(None, MappingProxyType({}), MappingProxyType({}))
+        self._stamp = None
+        self._checked = float("-inf")
+
+    @property
+    def databases(self):
+        return self.snapshot().databases
+
+    def snapshot(self):
+        if time.monotonic() - self._checked >= self.interval:
+            return self.refresh()
+        return self._snapshot
+
+    def refresh(self, force=False):
+        with self._lock:
+            self._checked = time.monotonic()
+            stamp = _file_stamp(self.path)
+            if stamp == self._stamp and not force:
+                return self._snapshot
+            self._stamp = stamp
+            conn = sqlite3.connect(str(self.path))
+            version = conn.execute("SELECT version FROM registry_version").fetchone()[0]
+            conn.close()
+            if version == self._snapshot.version and not force:
+                return self._snapshot
+            databases = read_databases(self.path)
+            derived = self.derive(databases) if self.derive else {}
+            old = self._snapshot
+            self._snapshot = Snapshot(version, MappingProxyType(databases), MappingProxyType(derived))
+        if self.on_change:
+            self.on_change(old, self._snapshot)
+        return self._snapshot
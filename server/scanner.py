@@ -0,0 +1,151 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+
+from compressed import compression, describe, source_name
+
+HASH_BYTES = 65536  # bytes hashed from each end of a file; 0 = size and mtime only
+
+def fingerprint(path, hash_bytes=HASH_BYTES, previous=None):
+    """{"size", "mtime_ns", "hash", "hash_bytes"} of a file.
+
+    The hash covers only the first and last `hash_bytes`, so it stays cheap
+    on multi-GB dumps; it is reused from `previous` when size and mtime have
+    not moved and it was taken with the same `hash_bytes`.
+    """
+    st = os.stat(path)
+    fp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": None, "hash_bytes": hash_bytes}
+    if previous and (previous["size"], previous["mtime_ns"], previous.get("hash_bytes", HASH_BYTES)) == (fp["size"], fp["mtime_ns"], hash_bytes):
+        fp["hash"] = previous.get("hash")
+    elif hash_bytes:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            h.update(f.read(hash_bytes))
+            if st.st_size > 2 * hash_bytes:
+                f.seek(-hash_bytes, os.SEEK_END)
+            h.update(f.read(hash_bytes))
+        fp["hash"] = h.hexdigest()
+    return fp
+
+def is_stale(current, imported, imported_at=None):
+    """Whether a source changed since it was imported.
+
+    `imported` is the fingerprint recorded at import time; for imports made
+    before fingerprints were recorded, compare the mtime with `imported_at`.
+    A new size or mtime always counts as a change, since the head/tail hash
+    can't see edits in the middle of a file; the hashes (when taken over
+    the same `hash_bytes`) catch edits that kept both.
+    """
+    if imported:
+        if (current["size"], current["mtime_ns"]) != (imported["size"], imported["mtime_ns"]):
+            return True
+        if current.get("hash") and imported.get("hash") and \
+                current.get("hash_bytes", HASH_BYTES) == imported.get("hash_bytes", HASH_BYTES):
+            return current["hash"] != imported["hash"]
+        return False
+    if imported_at:
+        try:
+            return current["mtime_ns"] / 1e9 > datetime.fromisoformat(imported_at).timestamp()
+        except ValueError:
+            return False
+    return False
+
+class SourceScanner:
+    """Fingerprints of the importable files in a directory, served from memory.
+
+    A background thread rescans every `interval` seconds, or as soon as
+    watchdog (optional) reports a change in the directory. Unchanged files
+    cost one stat per rescan; only new or modified ones are re-hashed.
+    Compressed files also get the format and uncompressed size of their
+    content (see compressed.describe), looked up again only when they change.
+    """
+
+    def __init__(self, root, extensions, interval=30, hash_bytes=HASH_BYTES):
+        self.root = Path(root)
+        self.extensions = tuple(extensions)
+        self.interval = interval
+        self.hash_bytes = hash_bytes
+        self.files = ()
+        self.scanned_at = None
+        self.scan_seconds = None
+        self.watching = False
+        self._fingerprints = {}
+        self._described = {}
+        self._wake = threading.Event()
+        self._scanned = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="source-scanner", daemon=True)
+        self._thread.start()
+        self._watch()
+
+    def _watch(self):
+        if Observer is None or not self.root.is_dir():
+            return
+        scanner = self
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                scanner._wake.set()
+        try:
+            observer = Observer()
+            observer.schedule(Handler(), str(self.root), recursive=False)
+            observer.daemon = True
+            observer.start()
+            self.watching = True
+        except OSError:
+            pass
+
+    def _run(self):
+        while True:
+            self._scan()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _scan(self):
+        started = time.time()
+        found, fingerprints, described = [], {}, {}
+        if self.root.is_dir():
+            for f in self.root.iterdir():
+                if f.suffix.lower() not in self.extensions:
+                    continue
+                try:
+                    fp = fingerprint(f, self.hash_bytes, self._fingerprints.get(str(f)))
+                except OSError:
+                    continue
+                fingerprints[str(f)] = fp
+                entry = {"name": source_name(f), "filename": f.name, "path": str(f), "type": f.suffix.lower(),
+                         "compression": None, "uncompressed_size": None, **fp}
+                if compression(f):
+                    key = (fp["size"], fp["mtime_ns"])
+                    cached = self._described.get(str(f))
+                    info = cached[1] if cached and cached[0] == key else describe(f)
+                    described[str(f)] = (key, info)
+                    entry.update(info, type=info["format"] or entry["type"])
+                    del entry["format"]
+                found.append(entry)
+        self._fingerprints, self._described = fingerprints, described
+        with self._scanned:
+            self.files = tuple(found)
+            self.scan_seconds = round(time.time() - started, 3)
+            self.scanned_at = time.time()
+            self._scanned.notify_all()
+
+    def rescan(self, timeout=30):
+        """Ask for an immediate rescan and wait for it to finish."""
+        with self._scanned:
+            before = self.scanned_at
+            self._wake.set()
+            self._scanned.wait_for(lambda: self.scanned_at != before, timeout)
+        return self.files
+
+    def wait_ready(self, timeout=30):
+        with self._scanned:
+            self._scanned.wait_for(lambda: self.scanned_at is not None, timeout)
+        return self.files
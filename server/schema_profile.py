@@ -0,0 +1,100 @@
+import json
+import sqlite3
+import time
+
+from normalize import NAME_KEYWORDS, EMAIL_KEYWORDS, PHONE_KEYWORDS, CP_KEYWORDS, CITY_KEYWORDS, matching_columns
+from db_pool import open_readonly
+
+PROFILE_VERSION = 1
+SAMPLE_ROWS = 10000  # rows read to estimate column selectivity
+ROLE_KEYWORDS = {
+    "cp": CP_KEYWORDS, "email": EMAIL_KEYWORDS, "phone": PHONE_KEYWORDS,
+    "city": CITY_KEYWORDS, "name": NAME_KEYWORDS, "matricule": ['matricule'],
+}
+
+def selectivity(db_path, table, columns, sample=SAMPLE_ROWS, immutable=False):
+    """Distinct / non-null ratio of each column over the first `sample` rows.
+
+    1.0 means every sampled value is different (an equality filter on it is
+    near-unique); values near 0 mean a filter will match large slices.
+    """
+    if not columns:
+        return {}
+    conn = open_readonly(db_path, mmap_size=0, cache_kb=8192, immutable=immutable)
+    try:
+        cols = ", ".join([f'"{c}"' for c in columns])
+        rows = conn.execute(f'SELECT {cols} FROM "{table}" LIMIT {int(sample)}').fetchall()
+    finally:
+        conn.close()
+    hints = {}
+    for i, c in enumerate(columns):
+        values = [r[i] for r in rows if r[i] not in (None, "")]
+        hints[c] = round(len(set(values)) / len(values), 3) if values else 0.0
+    return hints
+
+def build_profile(columns, meta=None, db_path=None, table=None):
+    """Compile what parse_query needs to know about a database's schema.
+
+    Maps each role (cp, email, phone, city, name) to its columns once, so
+    messages do not re-run keyword matching, and pre-renders the SELECT
+    lists. With `db_path` and `table`, also samples the role columns for
+    selectivity hints.
+    """
+    meta = meta or {}
+    shadow = meta.get("shadow") or {}
+    found = {role: matching_columns(columns, kw) for role, kw in ROLE_KEYWORDS.items()}
+    names = found["name"]
+    roles = {role: (found[role][0] if found[role] else None) for role in ("cp", "email", "phone", "city")}
+    roles["name"] = names
+    roles["search"] = names or columns[:5]
+    roles["matricule"] = bool(found["matricule"])
+    profile = {
+        "version": PROFILE_VERSION,
+        "columns": columns,
+        "roles": roles,
+        "name_shadows": [shadow[c] for c in names] if names and all(c in shadow for c in names) else [],
+        "select": ", ".join([f'"{c}"' for c in columns]) if shadow else "*",
+        "selectivity": {},
+    }
+    if table:
+        profile["fts_select"] = ", ".join([f'"{table}"."{c}"' for c in columns]) if shadow else f'"{table}".*'
+    if db_path and table:
+        role_cols = list(dict.fromkeys([c for c in roles.values() if isinstance(c, str)] + names))
+        try:
+            profile["selectivity"] = selectivity(db_path, table, role_cols, immutable=bool(meta.get("attached")))
+        except sqlite3.Error:
+            pass
+    return profile
+
+def load_profiles(index_db):
+    conn = sqlite3.connect(str(index_db))
+    try:
+        rows = conn.execute("SELECT name, version, imported_at, profile FROM profiles").fetchall()
+    finally:
+        conn.close()
+    return {name: (version, imported_at, json.loads(profile)) for name, version, imported_at, profile in rows}
+
+def save_profile(index_db, name, imported_at, profile):
+    conn = sqlite3.connect(str(index_db))
+    conn.execute("INSERT OR REPLACE INTO profiles (name, version, imported_at, built_at, profile) VALUES (?,?,?,?,?)",
+                 (name, PROFILE_VERSION, imported_at, time.strftime('%Y-%m-%dT%H:%M:%S'), json.dumps(profile)))
+    conn.commit()
+    conn.close()
+
+def compile_profiles(index_db, databases):
+    """Profile of every database in `databases`, reusing the persisted ones.
+
+    A stored profile is reused while its database's `imported_at` and
+    PROFILE_VERSION are unchanged; otherwise it is rebuilt and saved.
+    """
+    stored = load_profiles(index_db)
+    profiles = {}
+    for name, info in databases.items():
+        entry = stored.get(name)
+        if entry and entry[:2] == (PROFILE_VERSION, info["imported_at"]):
+            profiles[name] = entry[2]
+            continue
+        profile = build_profile(info["columns"], info["meta"], info["db_path"], info["table"])
+        save_profile(index_db, name, info["imported_at"], profile)
+        profiles[name] = profile
+    return profiles
@@ -0,0 +1,65 @@
+import sqlite3
+
+from normalize import NAME_KEYWORDS, matching_columns
+
+MIN_TERM = 3  # trigram tokenizer cannot match shorter terms
+
+def fts5_available():
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+def fts_table(table):
+    return f"{table}_fts"
+
+def search_columns(columns):
+    """Columns the name/free-text path of parse_query searches."""
+    name_cols = matching_columns(columns, NAME_KEYWORDS)
+    return name_cols or columns[:5]
+
+def build_fts(conn, table, columns):
+    """Build a trigram FTS5 side index over the searchable columns of `table`.
+
+    The index uses `table` as external content, so only the trigram postings
+    are stored. Returns the index metadata to record in the registry, or None
+    when FTS5/trigram is not compiled into this SQLite.
+    """
+    if not fts5_available():
+        return None
+    cols = search_columns(columns)
+    if not cols:
+        return None
+    fts = fts_table(table)
+    col_list = ", ".join([f'"{c}"' for c in cols])
+    conn.execute(f'DROP TABLE IF EXISTS "{fts}"')
+    conn.execute(f'''CREATE VIRTUAL TABLE "{fts}" USING fts5({col_list},
+        content="{table}", content_rowid="rowid", tokenize="trigram")''')
+    conn.execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+    conn.commit()
+    return {"table": fts, "columns": cols}
+
+def sync_fts(conn, fts_meta, table, where, params=(), delete=False):
+    """Add the rows of `table` matching `where` to its FTS index, or remove them with `delete`.
+
+    External-content indexes are not updated by writes to the table; rows
+    must be removed here before they are deleted from it.
+    """
+    fts = fts_meta["table"]
+    cols = ", ".join([f'"{c}"' for c in fts_meta["columns"]])
+    if delete:
+        conn.execute(f'INSERT INTO "{fts}"("{fts}", rowid, {cols}) SELECT \'delete\', rowid, {cols} FROM "{table}" WHERE {where}', params)
+    else:
+        conn.execute(f'INSERT INTO "{fts}"(rowid, {cols}) SELECT rowid, {cols} FROM "{table}" WHERE {where}', params)
+
+def match_expr(words):
+    """FTS5 MATCH expression requiring every word as a substring of any indexed column.
+
+    Returns None when a word is too short for the trigram index.
+    """
+    if not words or any(len(w) < MIN_TERM for w in words):
+        return None
+    return " AND ".join(['"' + w.replace('"', '""') + '"' for w in words])
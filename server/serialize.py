@@ -0,0 +1,43 @@
+import gzip
+import json
+from operator import itemgetter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024  # smaller bodies are sent as is
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+def compact(result):
+    """A run_query result with rows as arrays in `columns` order instead of dicts."""
+    cols = result["columns"]
+    if len(cols) == 1:
+        row_values = lambda row: (row[cols[0]],)
+    else:
+        row_values = itemgetter(*cols)  # tuples, encoded as arrays
+    return {**result, "format": "compact", "rows": list(map(row_values, result["rows"]))}
+
+def dumps(obj):
+    """JSON bytes, with orjson when it is installed; values it cannot encode become strings."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+def encode(body, accept_encoding=""):
+    """(body, content encoding or None): brotli if accepted and installed, else gzip if accepted."""
+    if len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    accepted = {e.split(";")[0].strip().lower() for e in (accept_encoding or "").split(",")}
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
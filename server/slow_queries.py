@@ -0,0 +1,86 @@
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+_ROWID_RANGE_RE = re.compile(r"INTEGER PRIMARY KEY \(rowid[<>]=?\?\)$")
+
+def sql_shape(sql):
+    """The SQL with literals replaced by ? and whitespace collapsed, so one query pattern is one entry."""
+    shape = _STRING_RE.sub("?", sql)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _LIST_RE.sub("(?, ...)", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+def is_full_scan(detail):
+    """An EXPLAIN QUERY PLAN step reading a whole table (not an index, not an FTS lookup).
+
+    A rowid range (how keyset pages walk the table) counts as a scan too.
+    """
+    if detail.startswith("SEARCH ") and _ROWID_RANGE_RE.search(detail):
+        return True
+    return detail.startswith("SCAN ") and "INDEX" not in detail and "VIRTUAL TABLE" not in detail
+
+def explain(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN as indented lines, and whether any step is a full table scan."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    depth, lines = {0: 0}, []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, 0) + 1
+        lines.append("  " * (depth[node] - 1) + detail)
+    return "\n".join(lines), any(is_full_scan(d) for *_, d in rows)
+
+class SlowQueryLog:
+    """Queries slower than `threshold_ms`, grouped by database and SQL shape in the index DB.
+
+    Each entry keeps a count, total/max/last time and the latest query plan,
+    with `full_scan` set when the plan reads a whole table. index_advisor.py
+    proposes indexes from it.
+    """
+
+    def __init__(self, path, threshold_ms=200):
+        self.path = str(path)
+        self.threshold_ms = threshold_ms
+        self.logged = 0
+        self._lock = threading.Lock()
+
+    def record(self, conn, database, sql, params, ms, rows):
+        """Log a query that took `ms` if it is over the threshold; `conn` is used for the plan."""
+        if self.threshold_ms is None or ms < self.threshold_ms:
+            return False
+        try:
+            plan, full_scan = explain(conn, sql, params)
+        except sqlite3.Error as e:
+            plan, full_scan = f"(no plan: {e})", False
+        now = datetime.now().isoformat()
+        with self._lock:
+            self.logged += 1
+            db = sqlite3.connect(self.path)
+            try:
+                db.execute("""INSERT INTO slow_queries VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(database, shape) DO UPDATE SET count = count + 1, total_ms = total_ms + excluded.total_ms,
+                        max_ms = MAX(max_ms, excluded.max_ms), last_ms = excluded.last_ms, rows = excluded.rows,
+                        plan = excluded.plan, full_scan = excluded.full_scan, last_seen = excluded.last_seen""",
+                           (database, sql_shape(sql), ms, ms, ms, rows, plan, int(full_scan), now, now))
+                db.commit()
+            finally:
+                db.close()
+        return True
+
+    def list(self, database=None, limit=100):
+        db = sqlite3.connect(self.path)
+        db.row_factory = sqlite3.Row
+        sql = "SELECT * FROM slow_queries" + (" WHERE database = ?" if database else "") + " ORDER BY total_ms DESC LIMIT ?"
+        rows = [dict(r) for r in db.execute(sql, ([database] if database else []) + [limit])]
+        db.close()
+        return rows
+
+    def clear(self, database=None):
+        db = sqlite3.connect(self.path)
+        db.execute("DELETE FROM slow_queries" + (" WHERE database = ?" if database else ""), [database] if database else [])
+        db.commit()
+        db.close()
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+class SummaryCache:
+    """LLM outputs stored in the index DB, keyed by sha256(model, system, prompt).
+
+    Generation is deterministic enough at a fixed temperature that the same
+    prompt can be answered from disk. The table is trimmed to `max_bytes` of
+    text, least recently used first.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model, system, prompt):
+        return hashlib.sha256(json.dumps([model, system, prompt], ensure_ascii=False).encode()).hexdigest()
+
+    def get(self, key):
+        conn = sqlite3.connect(self.path)
+        try:
+            row = conn.execute("SELECT response FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+        finally:
+            conn.close()
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[0] if row else None
+
+    def put(self, key, model, response):
+        size = len(response.encode())
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = sqlite3.connect(self.path)
+            try:
+                conn.execute("INSERT OR REPLACE INTO summaries (key, model, response, bytes, created_at, last_used) VALUES (?,?,?,?,?,?)",
+                             (key, model, response, size, now, now))
+                total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM summaries").fetchone()[0]
+                if total > self.max_bytes:
+                    evict, freed = [], 0
+                    for k, b in conn.execute("SELECT key, bytes FROM summaries ORDER BY last_used"):
+                        if total - freed <= self.max_bytes:
+                            break
+                        evict.append((k,))
+                        freed += b
+                    conn.executemany("DELETE FROM summaries WHERE key = ?", evict)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def clear(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("DELETE FROM summaries")
+        conn.commit()
+        conn.close()
+
+    def stats(self):
+        conn = sqlite3.connect(self.path)
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM summaries").fetchone()
+        conn.close()
+        total = self.hits + self.misses
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, "hits": self.hits,
+                "misses": self.misses, "hit_rate": round(self.hits / total, 3) if total else 0.0}